@@ -0,0 +1,41 @@
+# Operator-only endpoints, behind an X-Admin-Token header matching ADMIN_TOKEN.
+# With no token configured they are refused, unless ADMIN_OPEN=true (dev/test only).
+import os, secrets
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from . import slow_queries
+from .cache import cache
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        if os.getenv("ADMIN_OPEN", "false").lower() == "true":
+            return
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not (x_admin_token and secrets.compare_digest(x_admin_token, token)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+# slowest statement shapes seen by this worker
+@router.get("/slow-queries")
+def slow_query_report(limit: int = 20, order: Literal["p50", "p95", "max", "total"] = "p95"):
+    return slow_queries.top(min(limit, 500), order)
+
+
+@router.delete("/slow-queries", status_code=204)
+def slow_query_reset():
+    slow_queries.reset()
+
+
+@router.get("/cache")
+def cache_stats():
+    return cache.stats()
+
+
+@router.delete("/cache", status_code=204)
+def cache_clear():
+    cache.clear()
@@ -0,0 +1,190 @@
+# Async versions of the API routes in main.py, mounted instead of the sync
+# ones when DB_ASYNC=true. The bodies are the same app/crud.py functions, run
+# through AsyncSession.run_sync on the session's own (greenlet-driven)
+# connection, so no second pool is used and the two stacks can't drift.
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, status, Request, Response, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud
+from .database import get_async_db
+from .models import UserDB, CourseDB, ProjectDB
+from .importer import aiter_lines, iter_in_greenlet, import_lines
+from .streaming import ExportFormat, aexport_response
+from .schemas import (
+UserCreate, UserRead, UserUpdate, ProjectUpdate,
+CourseCreate, CourseRead,
+ProjectCreate, ProjectRead,
+ProjectReadWithOwner, ProjectCreateForUser,
+Page, IdList, BatchGetResult, ProjectSearchHit,
+BulkResult, BulkDeleteResult, UpsertResult, ImportResult, BatchRequest, BatchResponse
+)
+
+router = APIRouter()
+
+
+async def run_import(request: Request, db: AsyncSession, kind: str, fmt: str) -> dict:
+    def load(sync_db):
+        return import_lines(sync_db, kind, iter_in_greenlet(aiter_lines(request.stream())), fmt)
+    return (await db.run_sync(load)).__dict__
+
+
+#Courses
+@router.post("/api/courses", response_model=CourseRead, status_code=201)
+async def create_course(course: CourseCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_course, course)
+
+@router.put("/api/courses:upsert", response_model=UpsertResult)
+async def upsert_courses(courses: list[CourseCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.upsert_courses, courses)
+
+@router.post("/api/courses:batchGet", response_model=BatchGetResult[CourseRead])
+async def batch_get_courses(payload: IdList, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.batch_get_courses, payload)
+
+@router.post("/api/courses:bulk", response_model=BulkResult[CourseRead])
+async def bulk_create_courses(courses: list[CourseCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.bulk_create_courses, courses)
+
+@router.get("/api/courses", response_model=Union[list[CourseRead], BatchGetResult[CourseRead], Page[CourseRead]])
+async def list_courses(request: Request, response: Response, limit: int = 10, offset: int = 0,
+                       page_size: Optional[int] = None, cursor: Optional[str] = None,
+                       ids: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.list_courses, request, response, limit, offset, page_size, cursor, ids)
+
+@router.get("/api/courses/export")
+async def export_courses(fmt: ExportFormat = Query("ndjson", alias="format"),
+                         db: AsyncSession = Depends(get_async_db)):
+    return aexport_response(db, crud.export_stmt(CourseDB), fmt, "courses")
+
+@router.get("/api/courses/{course_id}", response_model=CourseRead)
+async def get_course(course_id: int, request: Request, response: Response,
+                     db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_course, request, response, course_id)
+
+#Projects
+@router.post("/api/projects", response_model=ProjectRead, status_code=201)
+async def create_project(project: ProjectCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_project, project)
+
+@router.post("/api/projects:bulk", response_model=BulkResult[ProjectRead])
+async def bulk_create_projects(projects: list[ProjectCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.bulk_create_projects, projects)
+
+@router.post("/api/projects:import", response_model=ImportResult)
+async def import_projects(request: Request, fmt: ExportFormat = Query("ndjson", alias="format"),
+                          db: AsyncSession = Depends(get_async_db)):
+    return await run_import(request, db, "projects", fmt)
+
+@router.put("/api/projects/{project_id}", response_model=ProjectRead)
+async def update_project(project_id: int, updated: ProjectCreate, response: Response,
+                         if_match: Optional[str] = Header(None),
+                         db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.update_project, response, project_id, updated, if_match)
+
+@router.patch("/api/projects/{project_id}", response_model=ProjectRead)
+async def patch_project(project_id: int, updated: ProjectUpdate, response: Response,
+                        if_match: Optional[str] = Header(None),
+                        db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.patch_project, response, project_id, updated, if_match)
+
+@router.post("/api/projects:batchGet", response_model=BatchGetResult[ProjectRead])
+async def batch_get_projects(payload: IdList, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.batch_get_projects, payload)
+
+@router.get("/api/projects", response_model=Union[list[ProjectRead], BatchGetResult[ProjectRead], Page[ProjectRead]])
+async def list_projects(request: Request, response: Response, limit: Optional[int] = None, offset: int = 0,
+                        page_size: Optional[int] = None, cursor: Optional[str] = None,
+                        fields: Optional[str] = None, expand: Optional[str] = None,
+                        ids: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.list_projects, request, response, limit, offset, page_size, cursor,
+                             fields, expand, ids)
+
+@router.get("/api/projects/export")
+async def export_projects(fmt: ExportFormat = Query("ndjson", alias="format"),
+                          db: AsyncSession = Depends(get_async_db)):
+    return aexport_response(db, crud.export_stmt(ProjectDB), fmt, "projects")
+
+@router.get("/api/projects/search", response_model=Page[ProjectSearchHit])
+async def search_projects(q: str = Query(..., min_length=1), page_size: Optional[int] = None,
+                          cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.search_projects, q, page_size, cursor)
+
+@router.get("/api/projects/{project_id}", response_model=ProjectReadWithOwner)
+async def get_project_with_owner(project_id: int, request: Request, response: Response,
+                                 fields: Optional[str] = None, expand: Optional[str] = None,
+                                 db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_project_with_owner, request, response, project_id, fields, expand)
+
+#Nested Routes
+@router.get("/api/users/{user_id}/projects", response_model=list[ProjectRead])
+async def get_user_projects(user_id: int, request: Request, response: Response,
+                            db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_user_projects, request, response, user_id)
+
+@router.post("/api/users/{user_id}/projects", response_model=ProjectRead, status_code=201)
+async def create_user_project(user_id: int, project: ProjectCreateForUser,
+                              db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_user_project, user_id, project)
+
+#Users
+@router.post("/api/users:batchGet", response_model=BatchGetResult[UserRead])
+async def batch_get_users(payload: IdList, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.batch_get_users, payload)
+
+@router.get("/api/users", response_model=Union[list[UserRead], BatchGetResult[UserRead], Page[UserRead]])
+async def list_users(request: Request, response: Response, limit: Optional[int] = None, offset: int = 0,
+                     page_size: Optional[int] = None, cursor: Optional[str] = None,
+                     email: Optional[str] = None, fields: Optional[str] = None,
+                     expand: Optional[str] = None, ids: Optional[str] = None,
+                     db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.list_users, request, response, limit, offset, page_size, cursor,
+                             email, fields, expand, ids)
+
+@router.get("/api/users/export")
+async def export_users(fmt: ExportFormat = Query("ndjson", alias="format"),
+                       db: AsyncSession = Depends(get_async_db)):
+    return aexport_response(db, crud.export_stmt(UserDB), fmt, "users")
+
+@router.post("/api/users:bulk", response_model=BulkResult[UserRead])
+async def bulk_create_users(users: list[UserCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.bulk_create_users, users)
+
+@router.post("/api/users:import", response_model=ImportResult)
+async def import_users(request: Request, fmt: ExportFormat = Query("ndjson", alias="format"),
+                       db: AsyncSession = Depends(get_async_db)):
+    return await run_import(request, db, "users", fmt)
+
+@router.get("/api/users/{user_id}", response_model=UserRead)
+async def get_user(user_id: int, request: Request, response: Response,
+                   fields: Optional[str] = None, expand: Optional[str] = None,
+                   db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_user, request, response, user_id, fields, expand)
+
+@router.post("/api/users", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+async def add_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.add_user, payload)
+
+@router.put("/api/users/{student_id}", response_model=UserRead)
+async def update_user(student_id: str, updated_user: UserCreate, response: Response,
+                      if_match: Optional[str] = Header(None),
+                      db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.update_user, response, student_id, updated_user, if_match)
+
+@router.patch("/api/users/{student_id}", response_model=UserRead)
+async def patch_user(student_id: str, updated_user: UserUpdate, response: Response,
+                     if_match: Optional[str] = Header(None),
+                     db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.patch_user, response, student_id, updated_user, if_match)
+
+@router.delete("/api/users/{user_id}", status_code=204)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)) -> Response:
+    return await db.run_sync(crud.delete_user, user_id)
+
+@router.delete("/api/users", response_model=BulkDeleteResult)
+async def delete_users(payload: IdList, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.delete_users, payload)
+
+#Batch
+@router.post("/api/batch", response_model=BatchResponse)
+async def run_batch(payload: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.run_batch, payload)
@@ -0,0 +1,155 @@
+# POST /api/batch: an ordered list of create/update/delete operations on
+# users, projects and courses, run in one transaction with one commit.
+#
+#   {"operations": [
+#     {"op": "create", "resource": "users", "ref": "ann", "data": {...}},
+#     {"op": "create", "resource": "projects", "data": {"name": "P1", "owner_id": "$ann.id"}},
+#     {"op": "update", "resource": "courses", "id": 3, "if_version": 2, "data": {"credits": 10}},
+#     {"op": "delete", "resource": "users", "id": "$0.id"}
+#   ]}
+#
+# The first failing operation rolls back the whole batch; the error names its index.
+import os, re
+from dataclasses import dataclass
+from typing import Any
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .cache import entity_key
+from .models import UserDB, ProjectDB, CourseDB
+from .pagination import is_id
+from .schemas import (
+    BatchOperation, UserCreate, UserUpdate, UserRead, ProjectCreate, ProjectUpdate, ProjectRead,
+    CourseCreate, CourseUpdate, CourseRead,
+)
+
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "1000"))
+
+# "$ann.id", "$0.project_id"
+_REF = re.compile(r"^\$(?P<name>[A-Za-z0-9_-]+)\.(?P<field>\w+)$")
+
+
+@dataclass
+class Resource:
+    model: type
+    create: type[BaseModel]
+    update: type[BaseModel]
+    read: type[BaseModel]
+    name: str  # singular, as in messages and cache keys
+
+    @property
+    def key(self):
+        return self.model.__mapper__.primary_key[0]
+
+RESOURCES = {
+    "users": Resource(UserDB, UserCreate, UserUpdate, UserRead, "user"),
+    "projects": Resource(ProjectDB, ProjectCreate, ProjectUpdate, ProjectRead, "project"),
+    "courses": Resource(CourseDB, CourseCreate, CourseUpdate, CourseRead, "course"),
+}
+
+
+class BatchError(HTTPException):
+    def __init__(self, index: int, status_code: int, detail):
+        super().__init__(status_code=status_code, detail={"index": index, "detail": detail})
+
+
+def _resolve(value, results: dict, index: int):
+    if isinstance(value, dict):
+        return {k: _resolve(v, results, index) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results, index) for v in value]
+    if isinstance(value, str) and (m := _REF.match(value)):
+        target = results.get(m["name"])
+        if target is None:
+            raise BatchError(index, 400, f"{value}: no earlier result named {m['name']!r}")
+        if m["field"] not in target:
+            raise BatchError(index, 400, f"{value}: result has no field {m['field']!r}")
+        return target[m["field"]]
+    return value
+
+
+def _validate(schema: type[BaseModel], data: dict, index: int, exclude_none: bool = False) -> dict:
+    try:
+        return schema.model_validate(data).model_dump(exclude_unset=True, exclude_none=exclude_none)
+    except ValidationError as e:
+        raise BatchError(index, 422, e.errors(include_url=False, include_context=False))
+
+
+def _run(db: Session, op: BatchOperation, index: int, data: dict, key):
+    res = RESOURCES[op.resource]
+    name = res.name.capitalize()
+    if op.op == "create":
+        values = _validate(res.create, data, index)
+    elif op.op == "update":
+        # null means "leave as is", as in the PATCH handlers
+        values = _validate(res.update, data, index, exclude_none=True)
+    if op.op != "delete" and values.get("owner_id") is not None and not db.get(UserDB, values["owner_id"]):
+        raise BatchError(index, 404, "User not found")
+
+    if op.op == "create":
+        stmt = insert(res.model).values(**values).returning(res.model)
+        return 201, db.execute(stmt).scalar_one()
+
+    if key is None:
+        raise BatchError(index, 400, f"{op.op} needs an id")
+    if not is_id(key):
+        raise BatchError(index, 400, f"id must be an integer, got {key!r}")
+    where = res.key == key
+    if op.op == "update" and not values:
+        # nothing to change: a read, like an empty PATCH; the version stays put
+        row = db.execute(select(res.model).where(where)).scalar_one_or_none()
+        if row is None:
+            raise BatchError(index, 404, f"{name} not found")
+        if op.if_version is not None and row.version != op.if_version:
+            raise BatchError(index, 412, f"{name} has changed")
+        return 200, row
+    if op.op == "update":
+        stmt = update(res.model).where(where).values(**values, version=res.model.version + 1)
+    else:
+        stmt = delete(res.model).where(where)
+    if op.if_version is not None:
+        stmt = stmt.where(res.model.version == op.if_version)
+    row = db.execute(stmt.returning(res.model if op.op == "update" else res.key)).scalar_one_or_none()
+    if row is None:
+        if op.if_version is not None and db.execute(select(res.key).where(where)).first():
+            raise BatchError(index, 412, f"{name} has changed")
+        raise BatchError(index, 404, f"{name} not found")
+    return (200, row) if op.op == "update" else (204, row)
+
+
+def execute_batch(db: Session, operations: list[BatchOperation]) -> tuple[list[dict], set]:
+    """Run every operation in db's transaction; the caller commits.
+
+    Returns the per-operation results and the cache keys to invalidate after
+    the commit. Raises BatchError, with the transaction rolled back, on the
+    first operation that fails.
+    """
+    results, named, stale = [], {}, set()
+    try:
+        for index, op in enumerate(operations):
+            key = _resolve(op.id, named, index)
+            data = _resolve(op.data, named, index)
+            try:
+                status, row = _run(db, op, index, data, key)
+            except IntegrityError:
+                raise BatchError(index, 409, "Conflicts with an existing row")
+            res = RESOURCES[op.resource]
+            if status == 204:
+                out: Any = None
+                stale.add((res.name, row))
+            else:
+                out = res.read.model_validate(row).model_dump(mode="json")
+                if status == 200:
+                    stale.add(entity_key(row))
+            results.append({"index": index, "status": status, "ref": op.ref, "data": out})
+            # deleted rows can still be referred to by id
+            visible = out if out is not None else {res.key.key: row}
+            named[str(index)] = visible
+            if op.ref:
+                named[op.ref] = visible
+    except HTTPException:
+        db.rollback()
+        raise
+    return results, stale
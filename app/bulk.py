@@ -0,0 +1,135 @@
+import os
+from fastapi import HTTPException
+from sqlalchemy import select, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+# rows per INSERT / IN (...) round-trip; keeps SQLite under its bound-parameter limit
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+
+def chunked(items: list, size: int = 0):
+    size = size or BULK_CHUNK_SIZE
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def dialect_insert(db: Session, model):
+    # INSERT ... ON CONFLICT lives in the dialect-specific insert() constructs
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert(model)
+    if name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT not supported for {name}")
+
+
+def existing_values(db: Session, col, values) -> set:
+    values = set(values)
+    if not values:
+        return set()
+    return set(db.execute(select(col).where(col.in_(values))).scalars())
+
+
+def parse_ids(ids: str) -> list[int]:
+    """?ids=1,2,3 -> [1, 2, 3]"""
+    try:
+        return [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+
+
+def order_by_request(ids: list[int], found: dict):
+    """(rows in the order asked for, ids not found); repeated ids are returned once."""
+    wanted = list(dict.fromkeys(ids))
+    return [found[i] for i in wanted if i in found], [i for i in wanted if i not in found]
+
+
+def get_many(db: Session, stmt, key_col, ids: list[int]):
+    """Fetch rows of stmt whose key_col is in ids, one IN (...) query per chunk."""
+    found = {}
+    for _, chunk in chunked(list(dict.fromkeys(ids))):
+        for obj in db.execute(stmt.where(key_col.in_(chunk))).scalars():
+            found[getattr(obj, key_col.key)] = obj
+    return order_by_request(ids, found)
+
+
+def bulk_insert_unique(db: Session, model, rows: list[dict], unique_cols: list[str]):
+    """Insert rows in one transaction, skipping (not failing on) unique conflicts.
+
+    unique_cols[0] must identify a row on its own; it is used to match the
+    RETURNING output back to the input. Returns (created, errors) where
+    errors is a list of {"index", "detail"} for the skipped rows.
+    The caller commits.
+    """
+    key = unique_cols[0]
+    created, errors = [], []
+    seen = {col: set() for col in unique_cols}
+    for start, chunk in chunked(rows):
+        taken = {col: existing_values(db, getattr(model, col), (r[col] for r in chunk))
+                 for col in unique_cols}
+        pending = {}
+        for i, row in enumerate(chunk, start):
+            clash = next((c for c in unique_cols if row[c] in taken[c] or row[c] in seen[c]), None)
+            if clash:
+                errors.append({"index": i, "detail": f"{clash} already exists"})
+                continue
+            for col in unique_cols:
+                seen[col].add(row[col])
+            pending[row[key]] = i
+        if not pending:
+            continue
+        # DO NOTHING still protects us from rows committed by someone else meanwhile
+        stmt = dialect_insert(db, model).on_conflict_do_nothing().returning(model)
+        params = [chunk[i - start] for i in pending.values()]
+        inserted = {getattr(obj, key): obj for obj in db.scalars(stmt, params)}
+        for value, i in pending.items():
+            if value in inserted:
+                created.append(inserted[value])
+            else:
+                errors.append({"index": i, "detail": "conflict"})
+    errors.sort(key=lambda e: e["index"])
+    return created, errors
+
+
+def bulk_upsert(db: Session, model, rows: list[dict], key: str):
+    """INSERT ... ON CONFLICT (key) DO UPDATE, chunked, skipping rows that wouldn't change.
+
+    Rows repeating an earlier row's key are left out and reported in errors
+    as {"index", "detail"}. Updated rows get their version bumped. Returns
+    (counts, updated_ids, errors), with counts holding inserted/updated/unchanged.
+    The caller commits.
+    """
+    key_col, pk = getattr(model, key), model.__mapper__.primary_key[0]
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    updated_ids, errors, seen = [], [], set()
+    for start, chunk in chunked(rows):
+        params = []
+        for i, row in enumerate(chunk, start):
+            if row[key] in seen:
+                errors.append({"index": i, "detail": f"{key} repeats an earlier item"})
+                continue
+            seen.add(row[key])
+            params.append(row)
+        if not params:
+            continue
+        # only to tell inserts from updates in the counts
+        existing = existing_values(db, key_col, (r[key] for r in params))
+        stmt = dialect_insert(db, model)
+        changing = [c for c in params[0] if c != key]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={**{c: stmt.excluded[c] for c in changing}, "version": model.version + 1},
+            # identical rows aren't written at all (and RETURNING skips them)
+            where=or_(*(getattr(model, c).is_distinct_from(stmt.excluded[c]) for c in changing)),
+        ).returning(key_col, pk)
+        written = {k: id_ for k, id_ in db.execute(stmt, params)}
+        for k, id_ in written.items():
+            if k in existing:
+                counts["updated"] += 1
+                updated_ids.append(id_)
+            else:
+                counts["inserted"] += 1
+        counts["unchanged"] += len(existing - written.keys())
+    return counts, updated_ids, errors
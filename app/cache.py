@@ -0,0 +1,154 @@
+# In-process read-through cache for single-entity GETs.
+#
+# Entries are the JSON-ready dict a route returns, keyed ("user", 1),
+# ("project", 7), ("course", 3), and bounded by TTL, entry count and
+# (approximate) bytes. Writers invalidate after commit: explicitly in the
+# handlers for Core INSERT/UPDATE/DELETE statements, and through the session
+# after_commit hook for ORM unit-of-work changes. Other workers hear about it
+# through app/invalidation.py.
+import json, os, threading, time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .metrics import CACHE_REQUESTS, CACHE_ENTRIES, CACHE_BYTES
+from .models import UserDB, ProjectDB, CourseDB
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+Key = tuple[str, Hashable]
+
+
+class EntityCache:
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl, self.max_entries, self.max_bytes = ttl, max_entries, max_bytes
+        self._data: "OrderedDict[Key, tuple]" = OrderedDict()  # key -> (expires, value, size, tags)
+        self._tagged: dict[Key, set] = {}  # tag key -> keys whose value embeds it
+        self._bytes = 0
+        # bumped on every invalidation; a load that straddles one isn't stored
+        self.epoch = 0
+        self.hits = self.misses = 0
+        # set by app.invalidation to ship invalidations to the other workers
+        self.broadcast: Optional[Callable[[list], None]] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                CACHE_REQUESTS.labels(key[0], "miss").inc()
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.labels(key[0], "hit").inc()
+            return entry[1]
+
+    def set(self, key: Key, value, tags: Iterable[Key] = (), epoch: int | None = None):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._drop(key)
+            tags = tuple(tags)
+            self._data[key] = (time.monotonic() + self.ttl, value, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+            self._report()
+
+    def invalidate(self, *keys: Key, broadcast: bool = True):
+        with self._lock:
+            self.epoch += 1
+            for key in keys:
+                self._drop(key)
+                for dependent in self._tagged.pop(key, ()):
+                    self._drop(dependent)
+            self._report()
+        if broadcast and keys and self.broadcast:
+            self.broadcast(list(keys))
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._data.clear()
+            self._tagged.clear()
+            self._bytes = 0
+            self._report()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "max_entries": self.max_entries,
+                    "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+    def _drop(self, key: Key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+        for tag in entry[3]:
+            keys = self._tagged.get(tag)
+            if keys:
+                keys.discard(key)
+
+    def _report(self):
+        CACHE_ENTRIES.set(len(self._data))
+        CACHE_BYTES.set(self._bytes)
+
+
+cache = EntityCache(CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+
+def read_through(key: Key, load: Callable[[], dict], tags: Callable[[dict], Iterable[Key]] = lambda v: ()):
+    """Cached value for key, else load() (which may raise 404) and remember it."""
+    if not CACHE_ENABLED:
+        return load()
+    value = cache.get(key)
+    if value is None:
+        epoch = cache.epoch
+        value = load()
+        cache.set(key, value, tags(value), epoch=epoch)
+    return value
+
+
+# ---------- ORM write tracking ----------
+def entity_key(obj) -> Key | None:
+    if isinstance(obj, UserDB):
+        return ("user", obj.id)
+    if isinstance(obj, ProjectDB):
+        return ("project", obj.project_id)
+    if isinstance(obj, CourseDB):
+        return ("course", obj.id)
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty(session, flush_context):
+    keys = session.info.setdefault("cache_keys", set())
+    for obj in (*session.dirty, *session.deleted):
+        key = entity_key(obj)
+        if key:
+            keys.add(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    keys = session.info.pop("cache_keys", None)
+    if keys:
+        cache.invalidate(*keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("cache_keys", None)
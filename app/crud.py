@@ -0,0 +1,393 @@
+# The API route bodies, written once against a sync Session.
+#
+# main.py calls these directly; with DB_ASYNC=true, app/async_routes.py runs
+# the same functions through AsyncSession.run_sync, which hands them the
+# AsyncSession's own (greenlet-driven) connection. Queries, validation,
+# status codes, ETags and cache invalidation therefore can't drift between
+# the two stacks; only export and import, which stream, have separate
+# sync and async plumbing in the routers.
+from typing import Optional
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from .batch import BATCH_MAX_OPERATIONS, execute_batch
+from .bulk import BULK_MAX_ITEMS, bulk_insert_unique, bulk_upsert, chunked, existing_values, parse_ids, get_many
+from .cache import cache, entity_key, read_through
+from .etag import version_etag, rows_etag, not_modified, if_match_versions, check_if_match
+from .fastjson import use_fast_json, as_rows, json_rows, fast_json
+from .fieldsets import fieldset
+from .models import UserDB, CourseDB, ProjectDB
+from .pagination import keyset_page, offset_stmt, next_link
+from .search import search_stmt, finish_search
+from .schemas import (
+    UserCreate, UserRead, UserUpdate, ProjectUpdate,
+    CourseCreate, CourseRead,
+    ProjectCreate, ProjectRead,
+    ProjectReadWithOwner, ProjectCreateForUser,
+    Page, BulkResult, IdList, BulkDeleteResult, BatchGetResult,
+    BatchRequest, BatchResponse, UpsertResult, ProjectSearchHit,
+)
+
+
+def commit_or_rollback(db: Session, error_msg: str):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=error_msg)
+
+
+# Runs one INSERT/UPDATE ... RETURNING and commits: no SELECT before, no refresh after.
+# Zero rows back means the WHERE matched nothing -> 404.
+def write_returning(db: Session, stmt, conflict_msg: str, not_found_msg: str = "Not found"):
+    try:
+        obj = db.execute(stmt).scalar_one_or_none()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=conflict_msg)
+    if obj is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=not_found_msg)
+    commit_or_rollback(db, conflict_msg)
+    return obj
+
+
+# write_returning for an UPDATE guarded by If-Match: it only applies while the row is
+# still at a version the client has seen. No row back is then 412 if the row exists.
+def write_if_match(db: Session, stmt, where, version_col, if_match: Optional[str],
+                   conflict_msg: str, not_found_msg: str):
+    versions = if_match_versions(if_match)
+    if versions is not None:
+        stmt = stmt.where(version_col.in_(versions))
+    try:
+        return write_returning(db, stmt, conflict_msg, not_found_msg)
+    except HTTPException as e:
+        if e.status_code == 404 and versions is not None and db.execute(select(version_col).where(where)).first():
+            raise HTTPException(status_code=412, detail="Precondition failed: resource has changed")
+        raise
+
+
+# UPDATE ... SET version = version + 1, applied under If-Match; drops the cached
+# entity and sends the new ETag
+def update_versioned(db: Session, model, where, values: dict, response: Response,
+                     if_match: Optional[str], conflict_msg: str, not_found_msg: str):
+    stmt = update(model).where(where).values(**values, version=model.version + 1).returning(model)
+    obj = write_if_match(db, stmt, where, model.version, if_match, conflict_msg, not_found_msg)
+    cache.invalidate(entity_key(obj))
+    response.headers["ETag"] = version_etag(obj.version)
+    return obj
+
+
+# An empty PATCH changes nothing, but still answers (and checks If-Match) like one
+def unchanged(obj, response: Response, if_match: Optional[str], not_found_msg: str):
+    if not obj:
+        raise HTTPException(status_code=404, detail=not_found_msg)
+    check_if_match(if_match, obj.version)
+    response.headers["ETag"] = version_etag(obj.version)
+    return obj
+
+
+def check_bulk_size(items: list):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+
+def export_stmt(model):
+    """Plain column select for export_response/aexport_response, in primary-key order."""
+    return select(*model.__table__.columns).order_by(*model.__table__.primary_key)
+
+
+# GET /api/users and /api/projects: ?ids=, ?fields=/?expand= (app/fieldsets.py),
+# FAST_JSON_ROUTES (app/fastjson.py), keyset and offset paging, all in one place.
+# A truncated offset page carries a Link: rel="next" header (app/pagination.py).
+def list_rows(db: Session, request: Request, response: Response, model, key_col, route: str,
+              read_schema, batch_get, filters: list, limit: Optional[int], offset: int,
+              page_size: Optional[int], cursor: Optional[str],
+              fields: Optional[str], expand: Optional[str], ids: Optional[str]):
+    fs = fieldset(model, fields, expand)
+    # ?ids=1,2,3: one IN (...) query instead of a GET per id
+    if ids is not None:
+        id_list = parse_ids(ids)
+        if fs is None:
+            return batch_get(db, IdList(ids=id_list))
+        check_bulk_size(id_list)
+        items, missing = get_many(db, select(model).options(*fs.options()), key_col, id_list)
+        return fast_json({"items": [fs.dump(o) for o in items], "missing": missing})
+    # column tuples straight to orjson, no per-row validation
+    fast = fs is None and use_fast_json(route)
+    base = as_rows(select(model), model) if fast else select(model)
+    if fs:
+        base = base.options(*fs.options())
+    base = base.where(*filters)
+    if page_size is not None or cursor is not None:
+        items, next_cursor = keyset_page(db, base, key_col, cursor, page_size, scalars=not fast)
+        if fs:
+            return fast_json({"items": [fs.dump(o) for o in items], "next_cursor": next_cursor})
+        if fast:
+            return fast_json({"items": json_rows(items), "next_cursor": next_cursor})
+        return Page[read_schema](items=items, next_cursor=next_cursor)
+    stmt, size = offset_stmt(base.order_by(key_col), limit, offset)
+    result = db.execute(stmt)
+    rows = (result if fast else result.scalars()).all()
+    if fs:
+        body = fast_json([fs.dump(o) for o in rows[:size]])
+    elif fast:
+        body = fast_json(json_rows(rows[:size]))
+    else:
+        body = rows[:size]
+    if len(rows) > size:
+        # returned Responses don't pick up headers set on the injected one
+        (body if isinstance(body, Response) else response).headers["Link"] = next_link(request, size, offset)
+    return body
+
+
+#Courses
+def create_course(db: Session, course: CourseCreate):
+    stmt = insert(CourseDB).values(**course.model_dump()).returning(CourseDB)
+    return write_returning(db, stmt, "Course already exists")
+
+
+def upsert_courses(db: Session, courses: list[CourseCreate]):
+    check_bulk_size(courses)
+    counts, updated_ids, errors = bulk_upsert(db, CourseDB, [c.model_dump() for c in courses], "code")
+    commit_or_rollback(db, "Course upsert failed")
+    if updated_ids:
+        cache.invalidate(*(("course", i) for i in updated_ids))
+    return UpsertResult(**counts, errors=errors)
+
+
+def batch_get_courses(db: Session, payload: IdList):
+    check_bulk_size(payload.ids)
+    items, missing = get_many(db, select(CourseDB), CourseDB.id, payload.ids)
+    return BatchGetResult[CourseRead](items=items, missing=missing)
+
+
+def bulk_create_courses(db: Session, courses: list[CourseCreate]):
+    check_bulk_size(courses)
+    created, errors = bulk_insert_unique(db, CourseDB, [c.model_dump() for c in courses], ["code"])
+    commit_or_rollback(db, "Bulk course creation failed")
+    return BulkResult[CourseRead](created=created, errors=errors)
+
+
+def list_courses(db: Session, request: Request, response: Response, limit: int, offset: int,
+                 page_size: Optional[int], cursor: Optional[str], ids: Optional[str]):
+    if ids is not None:
+        return batch_get_courses(db, IdList(ids=parse_ids(ids)))
+    if page_size is not None or cursor is not None:
+        items, next_cursor = keyset_page(db, select(CourseDB), CourseDB.id, cursor, page_size)
+        return (not_modified(request, response, rows_etag(items, "id", next_cursor))
+                or Page[CourseRead](items=items, next_cursor=next_cursor))
+    stmt, size = offset_stmt(select(CourseDB).order_by(CourseDB.id), limit, offset)
+    courses = db.execute(stmt).scalars().all()
+    if len(courses) > size:
+        response.headers["Link"] = next_link(request, size, offset)
+    courses = courses[:size]
+    return not_modified(request, response, rows_etag(courses, "id")) or courses
+
+
+# cached; see app/cache.py
+def get_course(db: Session, request: Request, response: Response, course_id: int):
+    def load():
+        course = db.get(CourseDB, course_id)
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+        return CourseRead.model_validate(course).model_dump(mode="json")
+    course = read_through(("course", course_id), load)
+    return not_modified(request, response, version_etag(course["version"])) or course
+
+
+#Projects
+def create_project(db: Session, project: ProjectCreate):
+    if not db.get(UserDB, project.owner_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    stmt = insert(ProjectDB).values(**project.model_dump()).returning(ProjectDB)
+    return write_returning(db, stmt, "Project creation failed")
+
+
+# items whose owner doesn't exist are reported, the rest go in
+def bulk_create_projects(db: Session, projects: list[ProjectCreate]):
+    check_bulk_size(projects)
+    created, errors = [], []
+    for start, chunk in chunked(projects):
+        owners = existing_values(db, UserDB.id, (p.owner_id for p in chunk))
+        rows = []
+        for i, p in enumerate(chunk, start):
+            if p.owner_id in owners:
+                rows.append(p.model_dump())
+            else:
+                errors.append({"index": i, "detail": "User not found"})
+        if rows:
+            stmt = insert(ProjectDB).returning(ProjectDB, sort_by_parameter_order=True)
+            created.extend(db.scalars(stmt, rows))
+    commit_or_rollback(db, "Bulk project creation failed")
+    return BulkResult[ProjectRead](created=created, errors=errors)
+
+
+def batch_get_projects(db: Session, payload: IdList):
+    check_bulk_size(payload.ids)
+    items, missing = get_many(db, select(ProjectDB), ProjectDB.project_id, payload.ids)
+    return BatchGetResult[ProjectRead](items=items, missing=missing)
+
+
+def update_project(db: Session, response: Response, project_id: int, updated: ProjectCreate,
+                   if_match: Optional[str]):
+    return update_versioned(db, ProjectDB, ProjectDB.project_id == project_id, updated.model_dump(),
+                            response, if_match, "Project already exists or owner invalid", "Project not found")
+
+
+def patch_project(db: Session, response: Response, project_id: int, updated: ProjectUpdate,
+                  if_match: Optional[str]):
+    changes = updated.model_dump(exclude_unset=True, exclude_none=True)
+    if not changes:
+        return unchanged(db.get(ProjectDB, project_id), response, if_match, "Project not found")
+    return update_versioned(db, ProjectDB, ProjectDB.project_id == project_id, changes,
+                            response, if_match, "Project already exists or owner invalid", "Project not found")
+
+
+def list_projects(db: Session, request: Request, response: Response, limit: Optional[int], offset: int,
+                  page_size: Optional[int], cursor: Optional[str], fields: Optional[str],
+                  expand: Optional[str], ids: Optional[str]):
+    # ordered by ProjectDB.project_id, not ProjectDB.id
+    return list_rows(db, request, response, ProjectDB, ProjectDB.project_id, "list_projects", ProjectRead,
+                     batch_get_projects, [], limit, offset, page_size, cursor, fields, expand, ids)
+
+
+def search_projects(db: Session, q: str, page_size: Optional[int], cursor: Optional[str]):
+    stmt, size = search_stmt(db.get_bind().dialect.name, q, cursor, page_size)
+    items, next_cursor = finish_search(db.execute(stmt).all(), size)
+    return Page[ProjectSearchHit](items=items, next_cursor=next_cursor)
+
+
+# cached, and dropped again when the owner changes
+def get_project_with_owner(db: Session, request: Request, response: Response, project_id: int,
+                           fields: Optional[str], expand: Optional[str]):
+    where = ProjectDB.project_id == project_id
+    fs = fieldset(ProjectDB, fields, expand)
+    if fs:
+        proj = db.execute(select(ProjectDB).where(where).options(*fs.options())).scalar_one_or_none()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return fast_json(fs.dump(proj))
+    def load():
+        proj = db.execute(select(ProjectDB).where(where).options(selectinload(ProjectDB.owner))).scalar_one_or_none()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return ProjectReadWithOwner.model_validate(proj).model_dump(mode="json")
+    project = read_through(("project", project_id), load, lambda p: [("user", p["owner_id"])])
+    # the owner is embedded, so its version is part of the representation too
+    etag = version_etag(project["version"], project["owner"]["version"])
+    return not_modified(request, response, etag) or project
+
+
+#Nested Routes
+def get_user_projects(db: Session, request: Request, response: Response, user_id: int):
+    stmt = select(ProjectDB).where(ProjectDB.owner_id == user_id).order_by(ProjectDB.project_id)
+    rows = db.execute(stmt).scalars().all()
+    return not_modified(request, response, rows_etag(rows, "project_id")) or rows
+
+
+def create_user_project(db: Session, user_id: int, project: ProjectCreateForUser):
+    if not db.get(UserDB, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    stmt = insert(ProjectDB).values(**project.model_dump(), owner_id=user_id).returning(ProjectDB)
+    return write_returning(db, stmt, "Project creation failed")
+
+
+#Users
+def list_users(db: Session, request: Request, response: Response, limit: Optional[int], offset: int,
+               page_size: Optional[int], cursor: Optional[str], email: Optional[str],
+               fields: Optional[str], expand: Optional[str], ids: Optional[str]):
+    # matches ix_users_email_lower
+    filters = [func.lower(UserDB.email) == email.lower()] if email is not None else []
+    return list_rows(db, request, response, UserDB, UserDB.id, "list_users", UserRead, batch_get_users, filters,
+                     limit, offset, page_size, cursor, fields, expand, ids)
+
+
+# duplicate email/student_id are reported per item, the rest go in
+def bulk_create_users(db: Session, users: list[UserCreate]):
+    check_bulk_size(users)
+    rows = [u.model_dump() for u in users]
+    created, errors = bulk_insert_unique(db, UserDB, rows, ["email", "student_id"])
+    commit_or_rollback(db, "Bulk user creation failed")
+    return BulkResult[UserRead](created=created, errors=errors)
+
+
+def batch_get_users(db: Session, payload: IdList):
+    check_bulk_size(payload.ids)
+    items, missing = get_many(db, select(UserDB), UserDB.id, payload.ids)
+    return BatchGetResult[UserRead](items=items, missing=missing)
+
+
+# e.g. ?expand=projects: the user and their projects in one round-trip
+def get_user(db: Session, request: Request, response: Response, user_id: int,
+             fields: Optional[str], expand: Optional[str]):
+    fs = fieldset(UserDB, fields, expand)
+    if fs:
+        user = db.execute(select(UserDB).where(UserDB.id == user_id).options(*fs.options())).scalar_one_or_none()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return fast_json(fs.dump(user))
+    def load():
+        user = db.get(UserDB, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserRead.model_validate(user).model_dump(mode="json")
+    user = read_through(("user", user_id), load)
+    return not_modified(request, response, version_etag(user["version"])) or user
+
+
+def add_user(db: Session, payload: UserCreate):
+    stmt = insert(UserDB).values(**payload.model_dump()).returning(UserDB)
+    return write_returning(db, stmt, "User already exists")
+
+
+def update_user(db: Session, response: Response, student_id: str, updated_user: UserCreate,
+                if_match: Optional[str]):
+    return update_versioned(db, UserDB, UserDB.student_id == student_id, updated_user.model_dump(),
+                            response, if_match, "User already exists", "User not found")
+
+
+def patch_user(db: Session, response: Response, student_id: str, updated_user: UserUpdate,
+               if_match: Optional[str]):
+    updates = updated_user.model_dump(exclude_unset=True, exclude_none=True)
+    where = UserDB.student_id == student_id
+    if not updates:
+        user = db.execute(select(UserDB).where(where)).scalar_one_or_none()
+        return unchanged(user, response, if_match, "User not found")
+    return update_versioned(db, UserDB, where, updates, response, if_match,
+                            "User already exists", "User not found")
+
+
+# projects go with it via the FK's ON DELETE CASCADE, in the same statement
+def delete_user(db: Session, user_id: int) -> Response:
+    result = db.execute(delete(UserDB).where(UserDB.id == user_id))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    db.commit()
+    # also drops cached projects embedding this owner
+    cache.invalidate(("user", user_id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def delete_users(db: Session, payload: IdList):
+    check_bulk_size(payload.ids)
+    deleted = set()
+    for _, chunk in chunked(payload.ids):
+        stmt = delete(UserDB).where(UserDB.id.in_(chunk)).returning(UserDB.id)
+        deleted.update(db.execute(stmt).scalars())
+    db.commit()
+    cache.invalidate(*(("user", i) for i in deleted))
+    return BulkDeleteResult(deleted=sorted(deleted),
+                            missing=[i for i in dict.fromkeys(payload.ids) if i not in deleted])
+
+
+# ordered create/update/delete across resources, one transaction (app/batch.py)
+def run_batch(db: Session, payload: BatchRequest):
+    if len(payload.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+    results, stale = execute_batch(db, payload.operations)
+    commit_or_rollback(db, "Batch conflicts with existing data")
+    if stale:
+        cache.invalidate(*stale)
+    return BatchResponse(results=results)
@@ -1,7 +1,14 @@
-import os, time
+import os, random, threading, time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import await_only
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .metrics import POOL_WAIT, POOL_TIMEOUTS, POOL_CHECKED_OUT
+from .query_stats import instrument_engine
 from sqlalchemy.exc import OperationalError
 
 # Pick env file by APP_ENV (default dev)
@@ -14,26 +21,274 @@ load_dotenv(envfile, override=True)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
-RETRIES = int(os.getenv("DB_RETRIES", "10"))
-DELAY = float(os.getenv("DB_RETRY_DELAY", "1.5"))
+# Opt-in async stack: async engine + async route handlers (see app/async_routes.py)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+# dev/test convenience: run migrations at startup instead of only verifying
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+# Startup connection retries: jittered exponential backoff until the deadline
+DB_CONNECT_DEADLINE = float(os.getenv("DB_CONNECT_DEADLINE", "60"))
+DB_RETRY_DELAY = float(os.getenv("DB_RETRY_DELAY", "0.5"))  # first backoff step
+DB_RETRY_MAX_DELAY = float(os.getenv("DB_RETRY_MAX_DELAY", "10"))
+
+# Pool sizing is per process: total connections = workers * (size + overflow)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# always: SELECT 1 on every checkout; idle: only after DB_PRE_PING_IDLE seconds unused; never
+DB_PRE_PING = os.getenv("DB_PRE_PING", "idle").lower()
+PRE_PING_MODES = ("always", "idle", "never")
+DB_PRE_PING_IDLE = float(os.getenv("DB_PRE_PING_IDLE", "30"))
 
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-# small retry (harmless for SQLite, useful for Postgres)
-for _ in range(RETRIES):
-    try:
-        engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=SQL_ECHO,
-connect_args=connect_args)
-        with engine.connect(): # smoke test
-            pass
-        break
-    except OperationalError:
-        ime.sleep(DELAY)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False,
-expire_on_commit=False)
+# ---------- Pool ----------
+# Cumulative checkout stats for this process; see pool_status()
+pool_stats = {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0,
+              "wait_seconds_max": 0.0, "checked_out_max": 0}
+_pool_stats_lock = threading.Lock()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except PoolTimeout:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            POOL_WAIT.observe(waited)
+            if timed_out:
+                POOL_TIMEOUTS.inc()
+            with _pool_stats_lock:
+                pool_stats["checkouts"] += 1
+                pool_stats["timeouts"] += timed_out
+                pool_stats["wait_seconds_total"] += waited
+                pool_stats["wait_seconds_max"] = max(pool_stats["wait_seconds_max"], waited)
+                pool_stats["checked_out_max"] = max(pool_stats["checked_out_max"], self.checkedout())
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for the async engine (DB_ASYNC=true); feeds the same stats."""
+
+def pool_options(url: str) -> dict:
+    # a typo must not quietly turn pre-ping off; engines are built at startup
+    if DB_PRE_PING not in PRE_PING_MODES:
+        raise ValueError(f"DB_PRE_PING={DB_PRE_PING!r}: expected one of {', '.join(PRE_PING_MODES)}")
+    # in-memory SQLite keeps one connection per thread; nothing to size there
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": TimedQueuePool, "pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_PRE_PING == "always"}
+
+def ping_idle_connections(engine, idle_after: float):
+    """Pre-ping only connections that sat unused for idle_after seconds.
+
+    pool_pre_ping costs a round-trip on every checkout; a connection handed
+    back a moment ago is almost certainly still alive.
+    """
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        checked_in_at = record.info.get("checked_in_at")
+        # brand-new connections were just opened; recently returned ones are warm
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_after:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_conn)
+        except engine.dialect.loaded_dbapi.Error:
+            # the pool discards this connection and retries with a fresh one
+            raise DisconnectionError()
+
+def instrument_pool(engine):
+    """Checkout gauge and idle pre-ping for a pooled engine."""
+    # the idle ping goes first: when it fails the checkout is retried, and the
+    # gauge's listener must not have counted the abandoned attempt
+    if DB_PRE_PING == "idle":
+        ping_idle_connections(engine, DB_PRE_PING_IDLE)
+    event.listen(engine, "checkout", lambda *_: POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *_: POOL_CHECKED_OUT.dec())
+
+def _pool_sizes(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {}
+    return dict(size=pool.size(), checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow)
+
+def pool_status(engine) -> dict:
+    # pool_stats counts checkouts from both pools; the sizes are per pool
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **pool_stats, **_pool_sizes(pool)}
+    if _async_engine is not None:
+        status["async_pool"] = {"pool": type(_async_engine.pool).__name__, **_pool_sizes(_async_engine.pool)}
+    return status
+
+# SQLite ignores FOREIGN KEY / ON DELETE CASCADE unless asked per connection
+def enable_sqlite_fks(engine):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", lambda dbapi_conn, _: dbapi_conn.execute("PRAGMA foreign_keys=ON"))
+
+# Connection state, reported by the health endpoint
+db_state = {"ready": False, "attempts": 0, "last_error": None}
+
+def backoff_delay(attempt: int) -> float:
+    # "full jitter": workers that failed together don't retry together
+    return random.uniform(0, min(DB_RETRY_MAX_DELAY, DB_RETRY_DELAY * 2 ** attempt))
+
+def wait_for_db(engine, deadline: float = DB_CONNECT_DEADLINE):
+    """Block until a connection succeeds; re-raise once the deadline would pass."""
+    give_up_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        db_state["attempts"] += 1
+        try:
+            with engine.connect(): # smoke test
+                pass
+        except OperationalError as e:
+            db_state["last_error"] = str(e.orig)
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay > give_up_at:
+                raise
+            attempt += 1
+            time.sleep(delay)
+        else:
+            db_state.update(ready=True, last_error=None)
+            return
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """The app's engine, created and connection-tested on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                options = pool_options(DATABASE_URL)
+                engine = create_engine(DATABASE_URL, echo=SQL_ECHO, connect_args=connect_args,
+                                       **options)
+                if options:
+                    instrument_pool(engine)
+                enable_sqlite_fks(engine)
+                instrument_engine(engine)
+                wait_for_db(engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+def peek_engine():
+    """The engine if it has been created, without connecting or waiting."""
+    return _engine
+
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# ---------- Bulk load ----------
+def copy_rows(db, table, columns: list[str], rows: list[tuple], key: str | None = None):
+    """Load rows as fast as the backend allows, inside the session's transaction.
+
+    Postgres: psycopg COPY FROM STDIN. With a key, rows are COPY'd into a temp
+    staging table and moved across with INSERT ... ON CONFLICT DO NOTHING, so
+    duplicates are skipped instead of aborting the whole COPY.
+    SQLite: batched executemany of the same INSERT.
+    Returns the set of key values actually inserted (None when no key given).
+    """
+    if not rows:
+        return set() if key else None
+    cols = ", ".join(columns)
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql":
+        raw = db.connection().connection.driver_connection  # psycopg (Async)Connection
+        if dialect.is_async:
+            # reached through AsyncSession.run_sync: drive the async COPY from its greenlet
+            return await_only(_acopy_rows(raw, table.name, cols, rows, key))
+        return _copy_rows(raw, table.name, cols, rows, key)
+    params = [dict(zip(columns, row)) for row in rows]
+    if key is None:
+        db.execute(table.insert(), params)
+        return None
+    stmt = sqlite.insert(table).on_conflict_do_nothing().returning(table.c[key])
+    return set(db.execute(stmt, params).scalars())
+
+def _copy_rows(raw, table: str, cols: str, rows, key):
+    target = table if key is None else f"_import_{table}"
+    with raw.cursor() as cur:
+        if key is not None:
+            cur.execute(f"CREATE TEMP TABLE {target} AS SELECT {cols} FROM {table} WITH NO DATA")
+        with cur.copy(f"COPY {target} ({cols}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        if key is None:
+            return None
+        cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {target} "
+                    f"ON CONFLICT DO NOTHING RETURNING {key}")
+        inserted = {r[0] for r in cur.fetchall()}
+        cur.execute(f"DROP TABLE {target}")
+        return inserted
+
+async def _acopy_rows(raw, table: str, cols: str, rows, key):
+    # _copy_rows for psycopg.AsyncConnection
+    target = table if key is None else f"_import_{table}"
+    async with raw.cursor() as cur:
+        if key is not None:
+            await cur.execute(f"CREATE TEMP TABLE {target} AS SELECT {cols} FROM {table} WITH NO DATA")
+        async with cur.copy(f"COPY {target} ({cols}) FROM STDIN") as copy:
+            for row in rows:
+                await copy.write_row(row)
+        if key is None:
+            return None
+        await cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {target} "
+                          f"ON CONFLICT DO NOTHING RETURNING {key}")
+        inserted = {r[0] for r in await cur.fetchall()}
+        await cur.execute(f"DROP TABLE {target}")
+        return inserted
+
+# ---------- Async ----------
+# Same database, async driver: psycopg3 does both, SQLite needs aiosqlite
+def async_url(url: str) -> str:
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    if url.startswith(("postgresql://", "postgresql+psycopg2://")):
+        return "postgresql+psycopg://" + url.split("://", 1)[1]
+    return url
+
+_async_engine = None
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def get_async_engine():
+    # created lazily so the sync-only deployment never imports the async driver
+    global _async_engine
+    if _async_engine is None:
+        options = pool_options(DATABASE_URL)
+        if options:
+            options["poolclass"] = TimedAsyncQueuePool  # async engines need an asyncio-adapted pool
+        _async_engine = create_async_engine(async_url(DATABASE_URL), echo=SQL_ECHO, **options)
+        if options:
+            # pool events fire on the sync engine the async one wraps
+            instrument_pool(_async_engine.sync_engine)
+        enable_sqlite_fks(_async_engine.sync_engine)
+        instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+def peek_async_engine():
+    """The async engine if it has been created (DB_ASYNC=true), without creating it."""
+    return _async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
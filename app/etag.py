@@ -0,0 +1,131 @@
+# Weak ETags, If-None-Match -> 304, and Cache-Control on GET responses.
+#
+# A handler that can name its representation cheaply (from row versions, see
+# below) sets the ETag header itself; otherwise the JSON body is hashed.
+# Other content types (the CSV/NDJSON exports) stream through untouched.
+import hashlib, os
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+# no-cache: clients may keep a copy but must revalidate, which is what makes 304s pay off
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "private, no-cache")
+# headers a 304 must not carry; there's no body for them to describe
+_BODY_HEADERS = {b"content-length", b"content-type"}
+
+
+def weak_etag(data: bytes) -> str:
+    return f'W/"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def _not_modified(start: dict) -> dict:
+    headers = [(k, v) for k, v in start["headers"] if k.lower() not in _BODY_HEADERS]
+    return {**start, "status": 304, "headers": headers}
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start, chunks = None, []
+        mode = "buffer"  # or "pass" (send as is) / "drop" (304 already sent, swallow the body)
+
+        async def send_wrapper(message):
+            nonlocal start, mode
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.setdefault("cache-control", CACHE_CONTROL)
+                if message["status"] != 200:
+                    mode = "pass"
+                elif "etag" in headers:
+                    mode = "drop" if etag_matches(if_none_match, headers["etag"]) else "pass"
+                    if mode == "drop":
+                        message = _not_modified(message)
+                elif not headers.get("content-type", "").startswith("application/json"):
+                    mode = "pass"
+                if mode != "buffer":
+                    return await send(message)
+                start = message
+                return
+            if mode == "pass":
+                return await send(message)
+            more = message.get("more_body", False)
+            if mode == "drop":
+                if not more:
+                    await send({"type": "http.response.body", "body": b""})
+                return
+            chunks.append(message.get("body", b""))
+            if more:
+                return
+            body = b"".join(chunks)
+            etag = weak_etag(body)
+            MutableHeaders(scope=start)["etag"] = etag
+            if etag_matches(if_none_match, etag):
+                await send(_not_modified(start))
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# ---------- Version-based tags ----------
+# Rows carry a version bumped by every UPDATE, so a handler can tag (and answer
+# a conditional GET) from versions alone, without serializing anything.
+def version_etag(*versions: int) -> str:
+    """Strong ETag for a representation fully determined by these row versions.
+
+    The first version is the resource's own; If-Match is checked against it.
+    """
+    return '"' + ".".join(map(str, versions)) + '"'
+
+
+def rows_etag(rows, key: str, *extra) -> str:
+    parts = [f"{getattr(r, key)}:{r.version}" for r in rows] + [str(e) for e in extra]
+    return weak_etag(",".join(parts).encode())
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Tag the response; returns a 304 to send instead if the client has this one."""
+    response.headers["etag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"etag": etag})
+    return None
+
+
+def if_match_versions(if_match: Optional[str]) -> Optional[set[int]]:
+    """Versions an If-Match header allows; None when absent or "*" (any version).
+
+    If-Match uses the strong comparison, so weak and foreign tags match nothing.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"'):
+            head = tag[1:-1].split(".")[0]
+            if head.isdigit():
+                versions.add(int(head))
+    return versions
+
+
+def check_if_match(if_match: Optional[str], version: int):
+    versions = if_match_versions(if_match)
+    if versions is not None and version not in versions:
+        raise HTTPException(status_code=412, detail="Precondition failed: resource has changed")
@@ -0,0 +1,72 @@
+# ?fields= and ?expand= for users and projects.
+#
+#   GET /api/users/1?fields=name,email&expand=projects
+#   GET /api/projects?fields=name&expand=owner
+#
+# fields narrows the SELECT itself (load_only), not just the JSON; the primary
+# key is always included. expand eager-loads a relationship with selectinload,
+# one extra query however many rows there are. These responses skip the
+# response model and the entity cache.
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+from .models import UserDB, ProjectDB
+from .schemas import UserRead, ProjectRead
+
+# relationships each model may expand, and the schema the related rows are shown with
+EXPANSIONS = {
+    UserDB: {"projects": ProjectRead},
+    ProjectDB: {"owner": UserRead},
+}
+
+
+def _split(value: Optional[str]) -> list[str]:
+    return list(dict.fromkeys(v.strip() for v in (value or "").split(",") if v.strip()))
+
+
+@dataclass
+class Fieldset:
+    model: type
+    columns: list[str]  # in the response
+    expand: list[str]
+
+    def options(self) -> list:
+        mapper = inspect(self.model)
+        load = set(self.columns)
+        for name in self.expand:
+            # the join columns have to be loaded for selectinload to match rows up
+            load.update(c.key for c in mapper.relationships[name].local_columns)
+        opts = [load_only(*(getattr(self.model, c) for c in sorted(load)))]
+        return opts + [selectinload(getattr(self.model, name)) for name in self.expand]
+
+    def dump(self, obj) -> dict:
+        out = {c: getattr(obj, c) for c in self.columns}
+        for name in self.expand:
+            schema, related = EXPANSIONS[self.model][name], getattr(obj, name)
+            if isinstance(related, list):
+                out[name] = [schema.model_validate(r).model_dump(mode="json") for r in related]
+            else:
+                out[name] = schema.model_validate(related).model_dump(mode="json") if related else None
+        return out
+
+
+def fieldset(model, fields: Optional[str], expand: Optional[str]) -> Optional[Fieldset]:
+    """None when neither parameter is given: the route's normal response applies."""
+    if fields is None and expand is None:
+        return None
+    mapper = inspect(model)
+    known = [c.key for c in mapper.column_attrs]
+    requested = _split(fields) or known
+    unknown = [f for f in requested if f not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    expansions = _split(expand)
+    bad = [e for e in expansions if e not in EXPANSIONS[model]]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(bad)}; "
+                                                    f"allowed: {', '.join(EXPANSIONS[model])}")
+    pk = mapper.primary_key[0].key
+    columns = requested if pk in requested else [pk, *requested]
+    return Fieldset(model, columns, expansions)
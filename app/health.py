@@ -0,0 +1,105 @@
+# Liveness / readiness probes.
+#   /health/live  - the process is up; never touches the database
+#   /health/pool  - connection pool usage for this worker process
+#   /health/ready - safe to route traffic here: DB answers, pools have headroom,
+#                   OTHER_API_BASE is reachable. Results are cached for
+#                   HEALTH_CACHE_TTL seconds so frequent probes don't load the DB.
+import os, threading, time
+import httpx
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy.pool import QueuePool
+from .database import db_state, peek_engine, peek_async_engine, pool_status
+
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "2"))
+# not ready once this share of pool_size + max_overflow is checked out
+HEALTH_POOL_MAX_SATURATION = float(os.getenv("HEALTH_POOL_MAX_SATURATION", "0.9"))
+HEALTH_HTTP_TIMEOUT = float(os.getenv("HEALTH_HTTP_TIMEOUT", "1"))
+# an unreachable OTHER_API_BASE only fails readiness when this is true
+HEALTH_REQUIRE_OTHER_API = os.getenv("HEALTH_REQUIRE_OTHER_API", "false").lower() == "true"
+
+router = APIRouter()
+_cache = {"at": float("-inf"), "ready": False, "checks": {}}
+_lock = threading.Lock()
+
+
+def check_pool(engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return {"ok": True, "detail": type(pool).__name__}
+    capacity = pool.size() + pool._max_overflow
+    saturation = pool.checkedout() / capacity
+    return {"ok": saturation < HEALTH_POOL_MAX_SATURATION,
+            "checked_out": pool.checkedout(), "capacity": capacity,
+            "saturation": round(saturation, 3)}
+
+
+def check_db(engine) -> dict:
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "detail": str(e)}
+
+
+def check_other_api(base: str) -> dict:
+    try:
+        # any HTTP answer counts: we only care that it's reachable
+        httpx.get(base, timeout=HEALTH_HTTP_TIMEOUT)
+        return {"ok": True, "required": HEALTH_REQUIRE_OTHER_API}
+    except httpx.HTTPError as e:
+        return {"ok": False, "required": HEALTH_REQUIRE_OTHER_API, "detail": str(e)}
+
+
+def run_checks() -> tuple[bool, dict]:
+    engine = peek_engine()
+    if engine is None or not db_state["ready"]:
+        return False, {"db": {"ok": False, **db_state}}
+    checks = {"pool": check_pool(engine)}
+    # DB_ASYNC=true: the API routes check out from the async engine's pool instead
+    async_engine = peek_async_engine()
+    if async_engine is not None:
+        checks["async_pool"] = check_pool(async_engine)
+    # an exhausted pool would make the ping itself wait for pool_timeout
+    checks["db"] = check_db(engine) if checks["pool"]["ok"] else {"ok": False, "detail": "skipped"}
+    other = os.getenv("OTHER_API_BASE")
+    if other:
+        checks["other_api"] = check_other_api(other)
+    ready = all(c["ok"] or not c.get("required", True) for c in checks.values())
+    return ready, checks
+
+
+def readiness() -> tuple[bool, dict]:
+    with _lock:  # one probe refreshes, concurrent ones reuse its answer
+        if time.monotonic() - _cache["at"] >= HEALTH_CACHE_TTL:
+            ready, checks = run_checks()
+            _cache.update(at=time.monotonic(), ready=ready, checks=checks)
+        return _cache["ready"], _cache["checks"]
+
+
+@router.get("/health/live")
+def live():
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def ready():
+    ok, checks = readiness()
+    return JSONResponse(status_code=200 if ok else 503,
+                        content={"status": "ok" if ok else "unavailable", "checks": checks})
+
+
+# checkout wait / checked-out / overflow numbers for sizing pools per worker
+@router.get("/health/pool")
+def pool():
+    engine = peek_engine()
+    if engine is None:
+        return JSONResponse(status_code=503, content={"status": "unavailable", **db_state})
+    return pool_status(engine)
+
+
+# older probes still point here; same as /health/live
+@router.get("/health")
+def health():
+    return live()
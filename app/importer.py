@@ -0,0 +1,168 @@
+"""Streaming CSV/NDJSON import of users and projects.
+
+Used by the POST /api/{users,projects}:import endpoints and from the shell:
+
+    python -m app.importer users users.csv
+    python -m app.importer projects projects.ndjson --format ndjson
+"""
+import argparse, codecs, csv, json, os, sys
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+import anyio.from_thread
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from .bulk import existing_values
+from .database import copy_rows
+from .models import UserDB, ProjectDB
+from .schemas import UserCreate, ProjectCreate
+
+# rows validated and written per transaction
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# only the first N rejected rows are listed in the report; all are counted
+IMPORT_MAX_REPORTED = int(os.getenv("IMPORT_MAX_REPORTED", "1000"))
+
+
+@dataclass
+class ImportSpec:
+    model: type
+    schema: type[BaseModel]
+    key: Optional[str] = None  # unique column used to spot skipped duplicates
+
+SPECS = {
+    "users": ImportSpec(UserDB, UserCreate, key="email"),
+    "projects": ImportSpec(ProjectDB, ProjectCreate),
+}
+
+
+@dataclass
+class ImportReport:
+    accepted: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, line: int, detail: str):
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED:
+            self.errors.append({"line": line, "detail": detail})
+
+
+def parse_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, object]]:
+    """Yield (line_number, dict) per record, or (line_number, error message)."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, f"invalid JSON: {e}"
+
+
+def _describe(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _import_chunk(db: Session, spec: ImportSpec, chunk, report: ImportReport):
+    valid, seen = [], set()
+    for line, record in chunk:
+        if isinstance(record, str):
+            report.reject(line, record)
+            continue
+        try:
+            item = spec.schema.model_validate(record)
+        except ValidationError as e:
+            report.reject(line, _describe(e))
+            continue
+        if spec.key and getattr(item, spec.key) in seen:
+            report.reject(line, f"duplicate {spec.key} in chunk")
+            continue
+        if spec.key:
+            seen.add(getattr(item, spec.key))
+        valid.append((line, item))
+
+    if spec.model is ProjectDB:
+        owners = existing_values(db, UserDB.id, (item.owner_id for _, item in valid))
+        for line, item in valid:
+            if item.owner_id not in owners:
+                report.reject(line, "owner_id: User not found")
+        valid = [(line, item) for line, item in valid if item.owner_id in owners]
+
+    columns = list(spec.schema.model_fields)
+    rows = [tuple(getattr(item, c) for c in columns) for _, item in valid]
+    inserted = copy_rows(db, spec.model.__table__, columns, rows, key=spec.key)
+    for line, item in valid:
+        if inserted is None or getattr(item, spec.key) in inserted:
+            report.accepted += 1
+        else:
+            report.reject(line, f"{spec.key} or another unique field already exists")
+
+
+def import_lines(db: Session, kind: str, lines: Iterable[str], fmt: str) -> ImportReport:
+    """Validate and load records chunk by chunk, committing after each chunk."""
+    spec, report = SPECS[kind], ImportReport()
+    records = parse_records(lines, fmt)
+    while chunk := list(islice(records, IMPORT_CHUNK_SIZE)):
+        _import_chunk(db, spec, chunk, report)
+        db.commit()
+    return report
+
+
+# ---------- HTTP body -> lines ----------
+async def aiter_lines(chunks):
+    decoder, pending = codecs.getincrementaldecoder("utf-8")(), ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_from_async(ait):
+    """Drain an async iterator from a worker thread (run via run_in_threadpool)."""
+    while True:
+        try:
+            yield anyio.from_thread.run(ait.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+def iter_in_greenlet(ait):
+    """Drain an async iterator from sync code run by AsyncSession.run_sync."""
+    while True:
+        try:
+            yield await_only(ait.__anext__())
+        except StopAsyncIteration:
+            return
+
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import users or projects")
+    parser.add_argument("kind", choices=sorted(SPECS))
+    parser.add_argument("path", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="defaults to the file extension")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    from .database import SessionLocal, get_engine
+    get_engine()
+    src = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    with src, SessionLocal() as db:
+        report = import_lines(db, args.kind, src, fmt)
+    json.dump(report.__dict__, sys.stdout, indent=2)
+    print()
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
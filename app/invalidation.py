@@ -0,0 +1,216 @@
+# Cross-worker cache invalidation.
+#
+# Every worker keeps its own entity cache (app/cache.py), so a write handled
+# by one worker has to evict the key in all the others. Invalidations are
+# queued and shipped by a sender thread (writes never wait on it) and applied
+# by a listener thread in each worker:
+#
+#   postgres: NOTIFY on CACHE_INVALIDATION_CHANNEL, LISTEN on a dedicated connection
+#   file:     append-only JSON lines in CACHE_INVALIDATION_FILE, tailed by each
+#             worker (local stand-in for SQLite dev under gunicorn; best effort,
+#             a write racing a rotation can be missed)
+#
+# Whenever a listener may have missed messages (reconnect, file rotated) it
+# clears its whole cache rather than serve something stale.
+import abc, json, logging, os, queue, threading, uuid
+from typing import Optional
+import psycopg
+from psycopg import sql
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from .cache import CACHE_ENABLED, EntityCache, cache as default_cache
+from .database import backoff_delay
+
+log = logging.getLogger("app.invalidation")
+
+# auto: postgres when the database is Postgres, else file when a path is set, else off
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "auto").lower()
+CACHE_INVALIDATION_MODES = ("auto", "postgres", "file", "off")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+CACHE_INVALIDATION_FILE = os.getenv("CACHE_INVALIDATION_FILE", "")
+CACHE_INVALIDATION_POLL = float(os.getenv("CACHE_INVALIDATION_POLL", "0.1"))
+# the file is rotated once it grows past this; tailing workers then clear their cache
+CACHE_INVALIDATION_FILE_MAX = int(os.getenv("CACHE_INVALIDATION_FILE_MAX", str(1024 * 1024)))
+# NOTIFY payloads must stay under 8000 bytes
+_KEYS_PER_MESSAGE = 100
+
+
+class Broadcaster(abc.ABC):
+    def __init__(self, target: EntityCache = default_cache, origin: Optional[str] = None):
+        self.target = target
+        # our own messages come back to us; they were applied locally already
+        self.origin = origin or uuid.uuid4().hex
+        self._outbox: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def publish(self, keys):
+        self._outbox.put(list(keys))
+
+    def start(self):
+        self.target.broadcast = self.publish
+        for loop in (self._send_loop, self._listen_loop):
+            t = threading.Thread(target=loop, name=f"cache-{loop.__name__.strip('_')}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        if self.target.broadcast == self.publish:
+            self.target.broadcast = None
+        self._stop.set()
+        self._outbox.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+
+    def _send_loop(self):
+        while True:
+            keys = self._outbox.get()
+            if keys is None:
+                return
+            # coalesce whatever else queued up meanwhile into the same send
+            while not self._outbox.empty():
+                more = self._outbox.get_nowait()
+                if more is None:
+                    self._outbox.put(None)
+                    break
+                keys.extend(more)
+            messages = [json.dumps({"origin": self.origin, "keys": keys[i:i + _KEYS_PER_MESSAGE]})
+                        for i in range(0, len(keys), _KEYS_PER_MESSAGE)]
+            try:
+                self._send(messages)
+            except Exception:
+                log.exception("failed to publish %d cache invalidations", len(keys))
+
+    def _apply(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            log.warning("ignoring malformed invalidation message %r", payload[:200])
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.target.invalidate(*(tuple(k) for k in message.get("keys", ())), broadcast=False)
+
+    @abc.abstractmethod
+    def _send(self, messages: list[str]):
+        """Deliver the JSON messages to every worker (runs on the sender thread)."""
+
+    @abc.abstractmethod
+    def _listen_loop(self):
+        """Feed incoming messages to _apply() until self._stop is set (listener thread)."""
+
+
+class PostgresBroadcaster(Broadcaster):
+    def __init__(self, engine: Engine, channel: str = CACHE_INVALIDATION_CHANNEL, **kwargs):
+        super().__init__(**kwargs)
+        self.engine, self.channel = engine, channel
+        self.dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def _send(self, messages):
+        with self.engine.begin() as conn:
+            for message in messages:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.channel, "payload": message})
+
+    def _listen_loop(self):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                # its own connection, outside the pool: LISTEN holds it for good
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    self.target.clear()
+                    attempt = 0
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._apply(notify.payload)
+            except psycopg.Error as e:
+                log.warning("cache invalidation listener disconnected: %s", e)
+                self._stop.wait(backoff_delay(attempt))
+                attempt += 1
+
+
+class FileBroadcaster(Broadcaster):
+    def __init__(self, path: str = CACHE_INVALIDATION_FILE, poll: float = CACHE_INVALIDATION_POLL,
+                 max_bytes: int = CACHE_INVALIDATION_FILE_MAX, **kwargs):
+        super().__init__(**kwargs)
+        self.path, self.poll, self.max_bytes = path, poll, max_bytes
+        open(self.path, "a").close()
+        self._file = open(self.path, "rb")
+        self._ino = os.fstat(self._file.fileno()).st_ino
+        # only what's written from now on concerns us
+        self._file.seek(0, os.SEEK_END)
+        self._pending = b""
+
+    def stop(self):
+        super().stop()
+        self._file.close()
+
+    def _send(self, messages):
+        try:
+            if os.path.getsize(self.path) > self.max_bytes:
+                # readers notice the new inode and clear their cache
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
+        data = "".join(m + "\n" for m in messages).encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)  # one O_APPEND write, so lines from workers don't interleave
+        finally:
+            os.close(fd)
+
+    def _listen_loop(self):
+        while not self._stop.wait(self.poll):
+            try:
+                self._read_new()
+            except OSError:
+                log.exception("failed to read %s", self.path)
+
+    def _read_new(self):
+        try:
+            ino = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return  # mid-rotation
+        if ino != self._ino:
+            # rotated; anything we hadn't read yet is lost
+            self._file.close()
+            self._file = open(self.path, "rb")
+            self._ino, self._pending = ino, b""
+            self.target.clear()
+        data = self._pending + self._file.read()
+        # a writer may be mid-line; keep the tail for the next poll
+        cut = data.rfind(b"\n") + 1
+        self._pending = data[cut:]
+        for line in data[:cut].decode().splitlines():
+            if line:
+                self._apply(line)
+
+
+_broadcaster: Optional[Broadcaster] = None
+
+
+def start(engine: Engine) -> Optional[Broadcaster]:
+    """Start publishing/listening for this worker per CACHE_INVALIDATION (lifespan startup)."""
+    global _broadcaster
+    mode = CACHE_INVALIDATION
+    if mode not in CACHE_INVALIDATION_MODES:
+        raise ValueError(f"CACHE_INVALIDATION={mode!r}: expected one of {', '.join(CACHE_INVALIDATION_MODES)}")
+    if mode == "file" and not CACHE_INVALIDATION_FILE:
+        raise ValueError("CACHE_INVALIDATION=file needs CACHE_INVALIDATION_FILE set to a path "
+                         "every worker can read and append to")
+    if mode == "auto":
+        mode = ("postgres" if engine.dialect.name == "postgresql"
+                else "file" if CACHE_INVALIDATION_FILE else "off")
+    if not CACHE_ENABLED or mode == "off":
+        return None
+    _broadcaster = PostgresBroadcaster(engine) if mode == "postgres" else FileBroadcaster()
+    _broadcaster.start()
+    return _broadcaster
+
+
+def stop():
+    global _broadcaster
+    if _broadcaster is not None:
+        _broadcaster.stop()
+        _broadcaster = None
@@ -0,0 +1,80 @@
+# Prometheus metrics, served at /metrics.
+#
+# Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+# (see gunicorn.conf.py): every worker writes its samples there and /metrics
+# aggregates them, whichever worker answers the scrape.
+import os, time
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled",
+                   ["method", "route", "status"])
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency",
+                    ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge("http_requests_in_progress", "HTTP requests being handled",
+                  ["method"], multiprocess_mode="livesum")
+
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+                      buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Checkouts that hit pool_timeout")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out",
+                         multiprocess_mode="livesum")
+
+CACHE_REQUESTS = Counter("entity_cache_requests_total", "Entity cache lookups",
+                         ["entity", "result"])
+CACHE_ENTRIES = Gauge("entity_cache_entries", "Entries in the entity cache", multiprocess_mode="livesum")
+CACHE_BYTES = Gauge("entity_cache_bytes", "Approximate size of the entity cache", multiprocess_mode="livesum")
+
+# requests that matched no route share one label, so 404 scans can't blow up cardinality
+UNMATCHED = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    # the router stores the matched route in scope; its path keeps the {placeholders}
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method, status = scope["method"], 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.labels(method).dec()
+            labels = (method, route_template(scope), str(status))
+            REQUESTS.labels(*labels).inc()
+            LATENCY.labels(*labels).observe(time.perf_counter() - start)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
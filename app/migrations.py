@@ -0,0 +1,201 @@
+"""Versioned schema migrations.
+
+Run once per deploy, before any API worker starts:
+
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations --check    # exit 1 if the database is behind
+
+Workers only call verify_schema() at startup, which is a single SELECT, so
+boot time doesn't depend on how big the schema is. Set DB_AUTO_MIGRATE=true
+(dev/test) to have startup run upgrade() instead.
+
+Migrations are append-only: never edit one that has shipped, add a new one.
+Each describes its own tables rather than importing app.models, so replaying
+the history always builds the same schema.
+"""
+import argparse, sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, ForeignKey, func, text, inspect,
+)
+from sqlalchemy.engine import Connection, Engine
+
+VERSION_TABLE = "schema_version"
+# arbitrary key for pg_advisory_lock so two deploys can't migrate at once
+_PG_LOCK_ID = 7_104_312
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+    # False runs outside a transaction (needed for CREATE INDEX CONCURRENTLY)
+    transactional: bool = True
+
+
+def _create_index(conn: Connection, name: str, table: str, expr: str):
+    # CONCURRENTLY doesn't block writes while the index builds on Postgres
+    concurrently = "CONCURRENTLY " if conn.dialect.name == "postgresql" else ""
+    conn.exec_driver_sql(f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({expr})")
+
+
+# ---------- History ----------
+def _v1_initial(conn: Connection):
+    md = MetaData()
+    Table("users", md,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(100), nullable=False),
+          Column("email", String, unique=True, nullable=False),
+          Column("age", Integer, nullable=False),
+          Column("student_id", String, unique=True, nullable=False))
+    Table("projects", md,
+          Column("project_id", Integer, primary_key=True),
+          Column("name", String, nullable=False),
+          Column("description", String, nullable=True),
+          Column("owner_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False))
+    Table("courses", md,
+          Column("id", Integer, primary_key=True),
+          Column("code", String, unique=True, nullable=False),
+          Column("name", String, nullable=False),
+          Column("credits", Integer, nullable=False))
+    # checkfirst: adopts databases created by the old import-time create_all
+    md.create_all(conn, checkfirst=True)
+
+
+def _v2_query_indexes(conn: Connection):
+    _create_index(conn, "ix_projects_owner_id_project_id", "projects", "owner_id, project_id")
+    _create_index(conn, "ix_users_email_lower", "users", "lower(email)")
+
+
+def _v3_row_versions(conn: Connection):
+    # constant default: metadata-only on Postgres 11+, no table rewrite
+    for table in ("users", "projects", "courses"):
+        if "version" not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _v4_project_search(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        # generated column: Postgres keeps it current on every write, COPY included.
+        # Adding it rewrites the table once.
+        conn.exec_driver_sql(
+            "ALTER TABLE projects ADD COLUMN IF NOT EXISTS search tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED")
+        conn.exec_driver_sql("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_projects_search "
+                             "ON projects USING gin (search)")
+        return
+    # FTS5 index over the projects rows (external content), synced by triggers
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5("
+        "name, description, content='projects', content_rowid='project_id', "
+        "tokenize='porter unicode61')")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS projects_fts_ai AFTER INSERT ON projects BEGIN "
+        "INSERT INTO projects_fts(rowid, name, description) "
+        "VALUES (new.project_id, new.name, new.description); END")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS projects_fts_ad AFTER DELETE ON projects BEGIN "
+        "INSERT INTO projects_fts(projects_fts, rowid, name, description) "
+        "VALUES ('delete', old.project_id, old.name, old.description); END")
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS projects_fts_au AFTER UPDATE OF name, description ON projects BEGIN "
+        "INSERT INTO projects_fts(projects_fts, rowid, name, description) "
+        "VALUES ('delete', old.project_id, old.name, old.description); "
+        "INSERT INTO projects_fts(rowid, name, description) "
+        "VALUES (new.project_id, new.name, new.description); END")
+    # index the rows that were there before the triggers
+    conn.exec_driver_sql("INSERT INTO projects_fts(projects_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", _v1_initial),
+    Migration(2, "projects owner index, users lower(email) index", _v2_query_indexes,
+              transactional=False),
+    Migration(3, "version column on users, projects, courses", _v3_row_versions),
+    Migration(4, "full-text search over projects", _v4_project_search, transactional=False),
+]
+LATEST = MIGRATIONS[-1].version
+
+
+# ---------- Runner ----------
+def _version_table():
+    return Table(VERSION_TABLE, MetaData(),
+                 Column("version", Integer, primary_key=True),
+                 Column("description", String, nullable=False),
+                 Column("applied_at", DateTime, server_default=func.now(), nullable=False))
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(VERSION_TABLE):
+        return 0
+    return conn.execute(text(f"SELECT max(version) FROM {VERSION_TABLE}")).scalar() or 0
+
+
+def verify_schema(engine: Engine):
+    """Fail fast if the database is behind this build. One query, no DDL."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST:
+        raise RuntimeError(f"Database schema is at version {version}, this build needs {LATEST}. "
+                           "Run `python -m app.migrations` first.")
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    # autocommit: an idle open transaction here would stall CREATE INDEX CONCURRENTLY
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _PG_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _PG_LOCK_ID})
+
+
+def upgrade(engine: Engine, target: int = LATEST) -> list[int]:
+    """Apply pending migrations up to target; returns the versions applied."""
+    table = _version_table()
+    applied = []
+    with _migration_lock(engine):
+        with engine.begin() as conn:
+            table.create(conn, checkfirst=True)
+            current = current_version(conn)
+        for m in MIGRATIONS:
+            if not current < m.version <= target:
+                continue
+            conn = engine.connect()
+            if not m.transactional:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            with conn, conn.begin():
+                m.upgrade(conn)
+                conn.execute(table.insert().values(version=m.version, description=m.description))
+            applied.append(m.version)
+    return applied
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 if behind")
+    parser.add_argument("--target", type=int, default=LATEST)
+    args = parser.parse_args(argv)
+
+    from .database import get_engine
+    engine = get_engine()
+    if args.check:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        print(f"schema version {version}, latest {LATEST}")
+        return 0 if version >= LATEST else 1
+    applied = upgrade(engine, args.target)
+    print(f"applied {applied}" if applied else "schema up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy import String, Integer, ForeignKey, Index, func
 from typing import Optional
  
  
@@ -14,16 +14,27 @@ class UserDB(Base):
     email: Mapped[str] = mapped_column(unique=True, nullable=False)
     age: Mapped[int] = mapped_column(Integer, nullable=False)
     student_id: Mapped[str] = mapped_column(unique=True, nullable=False)
-    projects: Mapped[list["ProjectDB"]] = relationship(back_populates="owner", cascade="all,delete-orphan")
+    # bumped by every UPDATE; ETags and If-Match are built on it
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    projects: Mapped[list["ProjectDB"]] = relationship(back_populates="owner", cascade="all,delete-orphan",
+                                                        passive_deletes=True) # ondelete=CASCADE does the work
+    __mapper_args__ = {"version_id_col": version}
  
  #project database model
 class ProjectDB(Base):
     __tablename__ = "projects"
+    # owner_id first: serves the FK lookup and ordered per-owner listing
+    __table_args__ = (Index("ix_projects_owner_id_project_id", "owner_id", "project_id"),)
     project_id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # <- Optional
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     owner: Mapped["UserDB"] = relationship(back_populates="projects")
+    __mapper_args__ = {"version_id_col": version}
+ 
+# case-insensitive email lookups: WHERE lower(email) = lower(:email)
+Index("ix_users_email_lower", func.lower(UserDB.email))
  
  
 # B) Independent table
@@ -32,4 +43,6 @@ class CourseDB(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     code: Mapped[str] = mapped_column(unique=True)
     name: Mapped[str] = mapped_column(nullable=False) # required field
-    credits: Mapped[int] = mapped_column(nullable=False) # required field
\ No newline at end of file
+    credits: Mapped[int] = mapped_column(nullable=False) # required field
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
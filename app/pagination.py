@@ -0,0 +1,82 @@
+import base64, json, os
+from typing import Callable, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+# Hard cap on page size, whatever the client asks for
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "10"))
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+# Cursors are opaque to clients: base64 of {"k": <last key seen>}
+def encode_cursor(key) -> str:
+    raw = json.dumps({"k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def is_id(key) -> bool:
+    # bool is an int subclass; True must not pass for id 1
+    return type(key) is int
+
+
+def decode_cursor(cursor: str, valid: Callable[[object], bool] = is_id):
+    """The key in cursor; 400 unless valid(key), so junk never reaches a bind parameter."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not valid(key):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def keyset_stmt(stmt, key_col, cursor: Optional[str], limit: Optional[int]):
+    """Seek past the cursor on key_col instead of OFFSET-scanning.
+
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    size = clamp_limit(limit)
+    if cursor:
+        stmt = stmt.where(key_col > decode_cursor(cursor))
+    return stmt.order_by(key_col).limit(size + 1), size
+
+
+def offset_stmt(stmt, limit: Optional[int], offset: int):
+    """LIMIT/OFFSET for the legacy unpaged lists, also fetching one extra row.
+
+    With no limit the page is DEFAULT_PAGE_SIZE rows, never the whole table;
+    the extra row tells the caller to send next_link() so clients can see it.
+    """
+    size = clamp_limit(limit)
+    return stmt.limit(size + 1).offset(offset), size
+
+
+def next_link(request, size: int, offset: int) -> str:
+    """Link header (RFC 8288) pointing at the next LIMIT/OFFSET page."""
+    url = request.url.include_query_params(limit=size, offset=offset + size)
+    return f'<{url}>; rel="next"'
+
+
+def finish_page(rows, size: int, key_col):
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(getattr(rows[-1], key_col.key))
+
+
+def keyset_page(db: Session, stmt, key_col, cursor: Optional[str], limit: Optional[int],
+                scalars: bool = True):
+    """Returns (rows, next_cursor); next_cursor is None on the last page.
+
+    scalars=False returns Row tuples, for statements that select columns.
+    """
+    stmt, size = keyset_stmt(stmt, key_col, cursor, limit)
+    result = db.execute(stmt)
+    return finish_page((result.scalars() if scalars else result).all(), size, key_col)
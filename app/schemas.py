@@ -1,4 +1,4 @@
-from typing import Annotated, Optional, List
+from typing import Annotated, Any, Generic, Literal, Optional, List, TypeVar, Union
 from annotated_types import Ge, Le
 from pydantic import BaseModel, EmailStr, ConfigDict, StringConstraints
  
@@ -33,6 +33,7 @@ class UserRead(BaseModel):
     email: EmailStr
     age: AgeInt
     student_id: StudentIdStr
+    version: int
  
 # Optionally return users with their projects
 class ProjectRead(BaseModel):
@@ -41,6 +42,7 @@ class ProjectRead(BaseModel):
     name: ProjectNameStr
     description: Optional[DescStr] = None
     owner_id: int
+    version: int
  
 class UserReadWithProjects(UserRead):
     projects: List[ProjectRead] = []
@@ -66,12 +68,94 @@ class ProjectUpdate(BaseModel):
 class ProjectReadWithOwner(ProjectRead):
     owner: Optional["UserRead"] = None # use selectinload(ProjectDB.owner) when querying
  
+# Full-text search hit: GET /api/projects/search
+class ProjectHighlights(BaseModel):
+    name: str # matched terms wrapped in <mark></mark>
+    description: Optional[str] = None # best-matching fragment
+ 
+class ProjectSearchHit(ProjectRead):
+    score: float # lower is better
+    highlights: ProjectHighlights
+ 
 # ---------- Courses ----------
 class CourseCreate(BaseModel):
     code: CodeStr
     name: CourseNameStr
     credits: CreditsInt
  
+class CourseUpdate(BaseModel):
+    code: Optional[CodeStr] = None
+    name: Optional[CourseNameStr] = None
+    credits: Optional[CreditsInt] = None
+ 
 class CourseRead(CourseCreate):
     model_config = ConfigDict(from_attributes=True)
-    id: int
\ No newline at end of file
+    id: int
+    version: int
+ 
+# ---------- Pagination ----------
+T = TypeVar("T")
+ 
+# Envelope for keyset (cursor) pagination; pass next_cursor back as ?cursor=
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+ 
+# ---------- Bulk ----------
+class IdList(BaseModel):
+    ids: List[int]
+ 
+class BulkDeleteResult(BaseModel):
+    deleted: List[int]
+    missing: List[int] = []
+ 
+# Multi-get by id: items in request order, unknown ids listed in missing
+class BatchGetResult(BaseModel, Generic[T]):
+    items: List[T]
+    missing: List[int] = []
+ 
+class BulkError(BaseModel):
+    index: int # position in the request list
+    detail: str
+ 
+class BulkResult(BaseModel, Generic[T]):
+    created: List[T]
+    errors: List[BulkError] = []
+ 
+# ---------- Batch (POST /api/batch) ----------
+# Strings like "$ann.id" or "$0.id" in id/data are replaced by a field of an
+# earlier operation's result, named by its ref or by its index.
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    resource: Literal["users", "projects", "courses"]
+    id: Optional[Union[int, str]] = None # primary key, or a "$ref.field" string
+    data: dict[str, Any] = {}
+    ref: Optional[str] = None # name to refer back to this result by
+    if_version: Optional[int] = None # update/delete only if the row is still at this version
+ 
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+ 
+class BatchOperationResult(BaseModel):
+    index: int
+    status: int
+    ref: Optional[str] = None
+    data: Optional[dict[str, Any]] = None
+ 
+class BatchResponse(BaseModel):
+    results: List[BatchOperationResult]
+ 
+class UpsertResult(BaseModel):
+    inserted: int
+    updated: int
+    unchanged: int # already identical, not written
+    errors: List[BulkError] = []
+ 
+class RejectedRow(BaseModel):
+    line: int # line number in the uploaded file
+    detail: str
+ 
+class ImportResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[RejectedRow] = [] # capped at IMPORT_MAX_REPORTED entries
@@ -0,0 +1,101 @@
+# Full-text search over project names and descriptions.
+#
+# SQLite: the projects_fts FTS5 table, ranked with bm25().
+# Postgres: the generated projects.search tsvector (GIN index), ranked with ts_rank_cd().
+# Both are created and kept in sync by migration 4 (app/migrations.py).
+#
+# Results are ordered best first by a score where lower is better (bm25 is
+# already like that; the Postgres rank is negated), then by project_id.
+# The cursor is the (score, project_id) of the last hit.
+#
+# Highlights are HTML: the database marks matches with private-use sentinels,
+# then the text is escaped and only the sentinels become <mark> tags.
+import html, re
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+from .pagination import clamp_limit, decode_cursor, encode_cursor, is_id
+
+MARK_START, MARK_END = "<mark>", "</mark>"
+_START, _END = "\ue000", "\ue001"
+
+_SQLITE = """
+SELECT p.project_id, p.name, p.description, p.owner_id, p.version,
+       bm25(projects_fts, 10.0, 1.0) AS score,
+       highlight(projects_fts, 0, :start, :end) AS name_hl,
+       snippet(projects_fts, 1, :start, :end, '…', 16) AS description_hl
+FROM projects_fts JOIN projects p ON p.project_id = projects_fts.rowid
+WHERE projects_fts MATCH :q {after}
+ORDER BY score, p.project_id
+LIMIT :limit
+"""
+
+_POSTGRES = """
+SELECT p.project_id, p.name, p.description, p.owner_id, p.version,
+       -ts_rank_cd(p.search, query) AS score,
+       ts_headline('english', p.name, query,
+                   'HighlightAll=true, StartSel=' || :start || ', StopSel=' || :end) AS name_hl,
+       ts_headline('english', coalesce(p.description, ''), query,
+                   'MaxFragments=1, MaxWords=16, StartSel=' || :start || ', StopSel=' || :end) AS description_hl
+FROM projects p, websearch_to_tsquery('english', :q) AS query
+WHERE p.search @@ query {after}
+ORDER BY score, p.project_id
+LIMIT :limit
+"""
+
+_AFTER = {
+    "sqlite": "AND (bm25(projects_fts, 10.0, 1.0) > :score OR "
+              "(bm25(projects_fts, 10.0, 1.0) = :score AND p.project_id > :after_id))",
+    "postgresql": "AND (-ts_rank_cd(p.search, query) > :score OR "
+                  "(-ts_rank_cd(p.search, query) = :score AND p.project_id > :after_id))",
+}
+
+
+def fts5_query(q: str) -> str:
+    # every word must match; quoting stops user input being read as FTS5 syntax
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def _valid_key(key) -> bool:
+    # [score, project_id]
+    return (isinstance(key, list) and len(key) == 2
+            and type(key[0]) in (int, float) and is_id(key[1]))
+
+
+def search_stmt(dialect: str, q: str, cursor: Optional[str], limit: Optional[int]):
+    """(statement, page size) for one page of hits; fetches one extra row like keyset_stmt."""
+    if dialect not in _AFTER:
+        raise NotImplementedError(f"full-text search not supported for {dialect}")
+    if not re.search(r"\w", q):
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    size = clamp_limit(limit)
+    params = {"start": _START, "end": _END, "limit": size + 1,
+              "q": fts5_query(q) if dialect == "sqlite" else q}
+    after = ""
+    if cursor:
+        params["score"], params["after_id"] = decode_cursor(cursor, _valid_key)
+        after = _AFTER[dialect]
+    sql = _SQLITE if dialect == "sqlite" else _POSTGRES
+    return text(sql.format(after=after)).bindparams(**params), size
+
+
+def highlight_html(marked: Optional[str]) -> Optional[str]:
+    """Escape text marked with the sentinels, then turn them into <mark> tags."""
+    if not marked:
+        return None
+    return html.escape(marked).replace(_START, MARK_START).replace(_END, MARK_END)
+
+
+def finish_search(rows, size: int):
+    """(hits, next_cursor) from the rows of search_stmt."""
+    hits = [{
+        "project_id": r.project_id, "name": r.name, "description": r.description,
+        "owner_id": r.owner_id, "version": r.version, "score": r.score,
+        "highlights": {"name": highlight_html(r.name_hl),
+                       "description": highlight_html(r.description_hl)},
+    } for r in rows[:size]]
+    next_cursor = None
+    if len(rows) > size:
+        last = rows[size - 1]
+        next_cursor = encode_cursor([last.score, last.project_id])
+    return hits, next_cursor
@@ -0,0 +1,104 @@
+# Per-fingerprint statement timings for this process.
+#
+# Every statement timed by query_stats.instrument_engine lands here. Durations are kept per
+# fingerprint in a bounded LRU table (SLOW_QUERY_TABLE_SIZE shapes, the last
+# SLOW_QUERY_SAMPLES timings each) so p50/p95 stay cheap and memory is capped.
+# Statements over SLOW_QUERY_MS are logged; SELECTs over SLOW_QUERY_EXPLAIN_MS
+# also get their plan captured (0 disables), once per fingerprint: the EXPLAIN
+# runs on the request's connection, so a hot slow query must not pay for it
+# on every execution.
+import logging, os, threading
+from collections import OrderedDict, deque
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_MS = float(os.getenv("SLOW_QUERY_EXPLAIN_MS", "0"))
+SLOW_QUERY_TABLE_SIZE = int(os.getenv("SLOW_QUERY_TABLE_SIZE", "500"))
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "256"))
+
+log = logging.getLogger("app.slow_queries")
+
+
+class ShapeStats:
+    __slots__ = ("count", "total", "max", "samples", "plan")
+
+    def __init__(self):
+        self.count, self.total, self.max = 0, 0.0, 0.0
+        self.samples = deque(maxlen=SLOW_QUERY_SAMPLES)
+        self.plan = None
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_table: "OrderedDict[str, ShapeStats]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _explain(conn, statement, parameters):
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    try:
+        # a separate raw cursor: doesn't disturb the caller's results or fire our hooks.
+        # dbapi_connection is the driver's connection, or the sync adapter on async engines.
+        cur = conn.connection.dbapi_connection.cursor()
+        try:
+            # on Postgres a failed statement aborts the transaction; keep it to a savepoint
+            if not sqlite:
+                cur.execute("SAVEPOINT slow_query_explain")
+            try:
+                cur.execute(prefix + statement, parameters)
+                rows = cur.fetchall()
+            except Exception:
+                if not sqlite:
+                    cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            if not sqlite:
+                cur.execute("RELEASE SAVEPOINT slow_query_explain")
+            return "\n".join(str(row[-1] if sqlite else row[0]) for row in rows)
+        finally:
+            cur.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+
+def record(conn, statement: str, shape: str, parameters, executemany: bool, seconds: float):
+    with _lock:
+        stats = _table.get(shape)
+        if stats is None:
+            stats = _table[shape] = ShapeStats()
+            if len(_table) > SLOW_QUERY_TABLE_SIZE:
+                _table.popitem(last=False)
+        else:
+            _table.move_to_end(shape)
+        stats.add(seconds)
+    ms = seconds * 1000
+    if ms < SLOW_QUERY_MS:
+        return
+    log.warning("slow query (%.1fms): %s", ms, shape)
+    if (SLOW_QUERY_EXPLAIN_MS and ms >= SLOW_QUERY_EXPLAIN_MS and stats.plan is None
+            and not executemany and statement.lstrip()[:6].upper() == "SELECT"):
+        stats.plan = _explain(conn, statement, parameters)
+
+
+def top(limit: int = 20, order: str = "p95") -> list[dict]:
+    with _lock:
+        rows = [
+            {"fingerprint": shape, "count": s.count, "total_ms": s.total * 1000,
+             "p50_ms": s.percentile(0.5) * 1000, "p95_ms": s.percentile(0.95) * 1000,
+             "max_ms": s.max * 1000, "plan": s.plan}
+            for shape, s in _table.items()
+        ]
+    rows.sort(key=lambda r: r[f"{order}_ms"], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    with _lock:
+        _table.clear()
@@ -0,0 +1,89 @@
+"""Compare the validated and fast JSON paths of GET /api/users.
+
+    python -m benchmarks.list_serialization            # 10k rows, 20 runs each
+    python -m benchmarks.list_serialization --rows 50000 --runs 5 --page-size 5000
+
+Runs the real app in-process against an in-memory SQLite database, so the
+numbers include the query but not the network. Each run pages through the
+whole table with page_size/cursor (MAX_PAGE_SIZE is raised to --page-size
+for the benchmark), so every seeded row goes through the serializer.
+"""
+import argparse, os, statistics, time
+
+os.environ.setdefault("APP_ENV", "test")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import fastjson, pagination
+from app.database import get_db
+from app.main import app
+from app.models import Base, UserDB
+
+
+def _client(rows: int) -> TestClient:
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserDB), [
+            {"name": f"User {i}", "email": f"user{i}@atu.ie", "age": 20 + i % 50,
+             "student_id": f"S{i:07d}"} for i in range(rows)])
+    Session = sessionmaker(bind=engine)
+
+    def override_get_db():
+        with Session() as db:
+            yield db
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _fetch_all(client: TestClient, page_size: int) -> int:
+    """GET every page of /api/users; returns the number of rows served."""
+    served, params = 0, {"page_size": page_size}
+    while True:
+        r = client.get("/api/users", params=params)
+        r.raise_for_status()
+        body = r.json()
+        served += len(body["items"])
+        if not body["next_cursor"]:
+            return served
+        params["cursor"] = body["next_cursor"]
+
+
+def _time(client: TestClient, runs: int, page_size: int, rows: int) -> tuple[list[float], int]:
+    times, served = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        served = _fetch_all(client, page_size)
+        times.append(time.perf_counter() - start)
+        assert served == rows, f"served {served} rows, seeded {rows}"
+    return times, served
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+    pagination.MAX_PAGE_SIZE = max(pagination.MAX_PAGE_SIZE, args.page_size)
+
+    with _client(args.rows) as client:
+        results = {}
+        for label, routes in (("validated", set()), ("fast", {"list_users"})):
+            fastjson.FAST_JSON_ROUTES = routes
+            _time(client, 2, args.page_size, args.rows)  # warm up
+            results[label], served = _time(client, args.runs, args.page_size, args.rows)
+    pages = -(-served // args.page_size)
+    print(f"GET /api/users, {served} rows served in {pages} page(s) of {args.page_size}, {args.runs} runs")
+    for label, times in results.items():
+        print(f"  {label:<10} median {statistics.median(times) * 1000:8.1f} ms"
+              f"   min {min(times) * 1000:8.1f} ms")
+    speedup = statistics.median(results["validated"]) / statistics.median(results["fast"])
+    print(f"  speedup    {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
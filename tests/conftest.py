@@ -1,11 +1,19 @@
+import os
 import pytest
+
+# .env.test: in-memory app engine, migrations at startup; must be set before app import
+os.environ.setdefault("APP_ENV", "test")
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.main import app
 from app.database import get_db
+from app.cache import cache
 from app.models import Base
+from app.migrations import VERSION_TABLE, upgrade
+from app.query_stats import instrument_engine
 
 # In-memory SQLite, shared across threads
 engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False},
@@ -15,13 +23,53 @@ poolclass=StaticPool)
 def _fk_on(dbapi_conn, _):
     dbapi_conn.execute("PRAGMA foreign_keys=ON")
 
+# feeds the X-DB-Queries header, like the app engine
+instrument_engine(engine)
+
 TestingSessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
 @pytest.fixture(autouse=True)
 def _schema():
-    Base.metadata.create_all(bind=engine)
+    # migrated rather than create_all: brings the FTS table and its triggers too
+    upgrade(engine)
     yield
+    with engine.begin() as conn:
+        # external-content FTS5 keeps its own index; it would outlive the projects table
+        conn.exec_driver_sql("DROP TABLE IF EXISTS projects_fts")
+        conn.exec_driver_sql(f"DROP TABLE {VERSION_TABLE}")
     Base.metadata.drop_all(bind=engine)
+    # ids are reused by the next test's fresh tables
+    cache.clear()
+
+@pytest.fixture
+def db_engine():
+    return engine
+
+@pytest.fixture
+def max_queries():
+    """max_queries(response, n): fail if the request ran more than n SQL statements."""
+    def check(response, n):
+        used = int(response.headers["X-DB-Queries"])
+        assert used <= n, f"{response.request.method} {response.request.url.path} ran {used} queries, budget {n}"
+        return used
+    return check
+
+def user_data(i=1, **fields) -> dict:
+    # i keeps email and student_id unique across the users of one test
+    return {"name": f"U{i}", "email": f"u{i}@atu.ie", "age": 20, "student_id": f"S{i:07d}", **fields}
+
+@pytest.fixture
+def make_user(client):
+    """make_user(i, **fields): create user i through the API and return its JSON.
+
+    make_user.data(i, **fields) is the request body alone, for bulk/batch payloads.
+    """
+    def make(i=1, **fields):
+        r = client.post("/api/users", json=user_data(i, **fields))
+        assert r.status_code == 201, r.text
+        return r.json()
+    make.data = user_data
+    return make
 
 @pytest.fixture
 def client():
@@ -0,0 +1,190 @@
+import os, subprocess, sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import slow_queries
+from app.async_routes import router
+from app.database import get_async_db, async_url, enable_sqlite_fks
+from app.models import Base
+from app.query_stats import instrument_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def async_client():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    enable_sqlite_fks(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def create_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = override_get_db
+    with TestClient(app) as c:
+        # aiosqlite connections are tied to the loop that opened them
+        c.portal.call(create_schema)
+        yield c
+        c.portal.call(engine.dispose)
+
+
+def test_async_user_project_roundtrip(async_client):
+    r = async_client.post("/api/users", json={
+        "name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567",
+    })
+    assert r.status_code == 201
+    uid = r.json()["id"]
+    r = async_client.post(f"/api/users/{uid}/projects", json={"name": "P1"})
+    assert r.status_code == 201
+    pid = r.json()["project_id"]
+    r = async_client.patch(f"/api/projects/{pid}", json={"description": "d"})
+    assert r.json()["description"] == "d"
+    assert async_client.get(f"/api/projects/{pid}").json()["owner"]["id"] == uid
+    assert async_client.delete(f"/api/users/{uid}").status_code == 204
+    assert async_client.get(f"/api/projects/{pid}").status_code == 404
+
+
+def test_async_duplicate_course_is_409(async_client):
+    course = {"code": "C1", "name": "Course", "credits": 5}
+    assert async_client.post("/api/courses", json=course).status_code == 201
+    assert async_client.post("/api/courses", json=course).status_code == 409
+
+
+def test_async_url():
+    assert async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_url("postgresql+psycopg://u:p@db/x") == "postgresql+psycopg://u:p@db/x"
+
+
+def test_async_if_match(async_client):
+    async_client.post("/api/users", json={
+        "name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567",
+    })
+    r = async_client.patch("/api/users/S1234567", json={"age": 22}, headers={"If-Match": '"1"'})
+    assert r.json()["version"] == 2
+    r = async_client.patch("/api/users/S1234567", json={"age": 23}, headers={"If-Match": '"1"'})
+    assert r.status_code == 412
+
+
+def test_async_fields_and_expand(async_client):
+    uid = async_client.post("/api/users", json={
+        "name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567",
+    }).json()["id"]
+    async_client.post(f"/api/users/{uid}/projects", json={"name": "P1"})
+    r = async_client.get(f"/api/users/{uid}", params={"fields": "name", "expand": "projects"})
+    assert r.json()["name"] == "Ann" and r.json()["projects"][0]["name"] == "P1"
+    r = async_client.get("/api/projects", params={"fields": "name", "expand": "owner"})
+    assert r.json()[0]["owner"]["id"] == uid
+
+
+def test_async_batch_get(async_client):
+    for i in range(3):
+        async_client.post("/api/courses", json={"code": f"C{i}", "name": "Course", "credits": 5})
+    body = async_client.get("/api/courses", params={"ids": "3,9,1"}).json()
+    assert [c["id"] for c in body["items"]] == [3, 1] and body["missing"] == [9]
+    assert async_client.post("/api/courses:batchGet", json={"ids": [2]}).json()["items"][0]["code"] == "C1"
+
+
+def test_async_slow_select_gets_plan(async_client, monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_MS", 1e-9)
+    slow_queries.reset()
+    async_client.post("/api/users", json={
+        "name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567",
+    })
+    assert async_client.get("/api/users/1").status_code == 200
+    assert async_client.get("/api/users").status_code == 200
+    plans = [r["plan"] for r in slow_queries.top(50) if r["plan"]]
+    assert plans and not any(p.startswith("EXPLAIN failed") for p in plans)
+    slow_queries.reset()
+
+
+def test_every_api_route_has_an_async_twin():
+    from app.main import app
+    twins = {(r.path, m) for r in router.routes for m in r.methods}
+    sync = {(r.path, m) for r in app.routes
+            if isinstance(r, APIRoute) and r.path.startswith("/api") for m in r.methods}
+    assert sync - twins == set()
+
+
+def test_async_bulk_import_export(async_client):
+    users = [{"name": f"U{i}", "email": f"u{i}@atu.ie", "age": 20, "student_id": f"S{i:07d}"}
+             for i in range(3)]
+    r = async_client.post("/api/users:bulk", json=users + [users[0]])
+    assert len(r.json()["created"]) == 3 and r.json()["errors"][0]["index"] == 3
+    r = async_client.post("/api/projects:bulk", json=[{"name": "P1", "owner_id": 1},
+                                                      {"name": "P2", "owner_id": 99}])
+    assert [p["name"] for p in r.json()["created"]] == ["P1"]
+    body = '{"name": "U3", "email": "u3@atu.ie", "age": 20, "student_id": "S0000003"}\n{"name": "bad"}\n'
+    r = async_client.post("/api/users:import", content=body)
+    assert (r.json()["accepted"], r.json()["rejected"]) == (1, 1)
+    r = async_client.get("/api/users/export", params={"format": "csv"})
+    assert r.text.splitlines()[0].startswith("id,name,email") and len(r.text.splitlines()) == 5
+    r = async_client.request("DELETE", "/api/users", json={"ids": [1, 2, 42]})
+    assert r.json() == {"deleted": [1, 2], "missing": [42]}
+
+
+def test_async_batch_and_upsert(async_client):
+    r = async_client.post("/api/batch", json={"operations": [
+        {"op": "create", "resource": "users", "ref": "ann",
+         "data": {"name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567"}},
+        {"op": "create", "resource": "projects", "data": {"name": "P1", "owner_id": "$ann.id"}},
+    ]})
+    assert [x["status"] for x in r.json()["results"]] == [201, 201]
+    r = async_client.post("/api/batch", json={"operations": [
+        {"op": "delete", "resource": "users", "id": 1},
+        {"op": "delete", "resource": "users", "id": 1},
+    ]})
+    assert r.status_code == 404 and r.json()["detail"]["index"] == 1
+    assert async_client.get("/api/users/1").status_code == 200  # rolled back
+    courses = [{"code": "C1", "name": "One", "credits": 5}, {"code": "C2", "name": "Two", "credits": 5}]
+    assert async_client.put("/api/courses:upsert", json=courses).json()["inserted"] == 2
+    courses[1]["credits"] = 10
+    r = async_client.put("/api/courses:upsert", json=courses).json()
+    assert (r["inserted"], r["updated"], r["unchanged"]) == (0, 1, 1)
+
+
+# DB_ASYNC is read when app.database is imported, so the real app is built in a fresh
+# interpreter; cwd is tmp_path so no .env file overrides the environment below
+_DB_ASYNC_APP = """
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from app.main import app
+
+api = [r for r in app.routes if isinstance(r, APIRoute) and r.path.startswith("/api")]
+assert api and all(r.endpoint.__module__ == "app.async_routes" for r in api)
+with TestClient(app) as c:
+    r = c.post("/api/users", json={"name": "Ann", "email": "ann@atu.ie", "age": 21, "student_id": "S1234567"})
+    assert r.status_code == 201, r.text
+    uid = r.json()["id"]
+    assert c.post(f"/api/users/{uid}/projects", json={"name": "P1"}).status_code == 201
+    r = c.patch("/api/users/S1234567", json={"age": 22}, headers={"If-Match": '"1"'})
+    assert r.json()["version"] == 2 and r.headers["ETag"] == '"2"', r.headers
+    assert c.get("/api/projects/1").json()["owner"]["age"] == 22
+    assert [u["id"] for u in c.get("/api/users").json()] == [uid]
+    assert c.get("/health/pool").json()["async_pool"]["checked_out"] == 0
+print("ok")
+"""
+
+
+def test_app_with_db_async(tmp_path):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "DB_ASYNC": "true", "DB_AUTO_MIGRATE": "true",
+           "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}", "CACHE_INVALIDATION": "off"}
+    env.pop("APP_ENV", None)
+    proc = subprocess.run([sys.executable, "-c", _DB_ASYNC_APP], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "ok"
@@ -0,0 +1,91 @@
+from sqlalchemy import event
+
+
+def test_create_user_and_projects_by_ref(client, make_user):
+    r = client.post("/api/batch", json={"operations": [
+        {"op": "create", "resource": "users", "ref": "ann", "data": make_user.data()},
+        *({"op": "create", "resource": "projects", "data": {"name": f"P{i}", "owner_id": "$ann.id"}}
+          for i in range(3)),
+    ]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == [201] * 4
+    uid = results[0]["data"]["id"]
+    assert [p["name"] for p in client.get(f"/api/users/{uid}/projects").json()] == ["P0", "P1", "P2"]
+
+
+def test_one_commit_per_batch(client, db_engine):
+    commits = []
+    def count(conn):
+        commits.append(conn)
+    event.listen(db_engine, "commit", count)
+    try:
+        client.post("/api/batch", json={"operations": [
+            {"op": "create", "resource": "courses", "data": {"code": f"C{i}", "name": "C", "credits": 5}}
+            for i in range(5)
+        ]})
+    finally:
+        event.remove(db_engine, "commit", count)
+    assert len(commits) == 1
+
+
+def test_failure_rolls_back_everything(client, make_user):
+    r = client.post("/api/batch", json={"operations": [
+        {"op": "create", "resource": "users", "data": make_user.data(1)},
+        {"op": "create", "resource": "courses", "data": {"code": "C1", "name": "C", "credits": 5}},
+        {"op": "create", "resource": "users", "data": make_user.data(2, email="u1@atu.ie")},
+    ]})
+    assert r.status_code == 409
+    assert r.json()["detail"]["index"] == 2
+    assert client.get("/api/users").json() == []
+    assert client.get("/api/courses").json() == []
+
+
+def test_update_and_delete_with_refs_and_versions(client, make_user):
+    uid = make_user()["id"]
+    client.get(f"/api/users/{uid}")  # cached
+    r = client.post("/api/batch", json={"operations": [
+        {"op": "update", "resource": "users", "id": uid, "if_version": 1, "data": {"age": 30}},
+        {"op": "create", "resource": "courses", "ref": "c", "data": {"code": "C1", "name": "C", "credits": 5}},
+        {"op": "delete", "resource": "courses", "id": "$c.id"},
+    ]})
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == [200, 201, 204]
+    assert results[0]["data"]["version"] == 2
+    assert client.get(f"/api/users/{uid}").json()["age"] == 30
+    assert client.get(f"/api/courses/{results[1]['data']['id']}").status_code == 404
+
+
+def test_operation_errors(client, make_user):
+    uid = make_user()["id"]
+    def first_error(*ops):
+        r = client.post("/api/batch", json={"operations": list(ops)})
+        return r.status_code, r.json()["detail"]["index"]
+    assert first_error({"op": "update", "resource": "users", "id": uid, "if_version": 7, "data": {"age": 1}}) == (412, 0)
+    assert first_error({"op": "delete", "resource": "projects", "id": 99}) == (404, 0)
+    assert first_error({"op": "create", "resource": "projects", "data": {"name": "P", "owner_id": 99}}) == (404, 0)
+    assert first_error({"op": "create", "resource": "courses", "data": {"code": "C1"}}) == (422, 0)
+    assert first_error({"op": "delete", "resource": "courses", "id": "$nope.id"}) == (400, 0)
+    assert client.get(f"/api/users/{uid}").json()["age"] == 20
+
+
+def test_id_must_be_an_integer(client):
+    for id_ in ({"a": 1}, "abc", [1]):
+        r = client.post("/api/batch", json={"operations": [{"op": "delete", "resource": "users", "id": id_}]})
+        assert r.status_code in (400, 422), id_
+
+
+def test_update_ignores_nulls_and_empty_update_keeps_version(client):
+    client.post("/api/courses", json={"code": "C1", "name": "Course", "credits": 5})
+    r = client.post("/api/batch", json={"operations": [
+        {"op": "update", "resource": "courses", "id": 1, "data": {"name": None, "credits": 10}},
+        {"op": "update", "resource": "courses", "id": 1, "data": {}},
+        {"op": "update", "resource": "courses", "id": 1, "if_version": 2, "data": {"name": None}},
+    ]})
+    assert r.status_code == 200, r.text
+    assert [(x["data"]["name"], x["data"]["credits"], x["data"]["version"]) for x in r.json()["results"]] \
+        == [("Course", 10, 2)] * 3
+    r = client.post("/api/batch", json={"operations": [
+        {"op": "update", "resource": "courses", "id": 1, "if_version": 1, "data": {}},
+    ]})
+    assert r.status_code == 412
@@ -0,0 +1,48 @@
+import pytest
+
+from app import bulk
+
+
+def _seed(client, make_user, n=5):
+    for i in range(n):
+        uid = make_user(i)["id"]
+        client.post(f"/api/users/{uid}/projects", json={"name": f"P{i}"})
+        client.post("/api/courses", json={"code": f"C{i}", "name": f"Course {i}", "credits": 5})
+
+
+@pytest.mark.parametrize("resource, key", [("users", "id"), ("projects", "project_id"), ("courses", "id")])
+def test_get_by_ids_keeps_request_order(client, max_queries, resource, key, make_user):
+    _seed(client, make_user)
+    r = client.get(f"/api/{resource}", params={"ids": "4,99,2,4,1"})
+    max_queries(r, 1)
+    body = r.json()
+    assert [item[key] for item in body["items"]] == [4, 2, 1]
+    assert body["missing"] == [99]
+
+
+@pytest.mark.parametrize("resource", ["users", "projects", "courses"])
+def test_batch_get_post(client, resource, make_user):
+    _seed(client, make_user)
+    body = client.post(f"/api/{resource}:batchGet", json={"ids": [3, 5, 7]}).json()
+    assert len(body["items"]) == 2 and body["missing"] == [7]
+
+
+def test_large_lists_are_chunked(client, monkeypatch, max_queries, make_user):
+    _seed(client, make_user)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    r = client.post("/api/users:batchGet", json={"ids": [5, 4, 3, 2, 1]})
+    assert int(r.headers["X-DB-Queries"]) == 3
+    assert [u["id"] for u in r.json()["items"]] == [5, 4, 3, 2, 1]
+
+
+def test_ids_combine_with_fields(client, make_user):
+    _seed(client, make_user)
+    r = client.get("/api/users", params={"ids": "2,1", "fields": "name", "expand": "projects"})
+    assert r.json()["items"][0] == {"id": 2, "name": "U1", "projects": r.json()["items"][0]["projects"]}
+    assert r.json()["items"][0]["projects"][0]["name"] == "P1"
+
+
+def test_bad_and_oversized_id_lists(client, monkeypatch):
+    assert client.get("/api/users", params={"ids": "1,x"}).status_code == 400
+    monkeypatch.setattr("app.crud.BULK_MAX_ITEMS", 2)
+    assert client.post("/api/courses:batchGet", json={"ids": [1, 2, 3]}).status_code == 413
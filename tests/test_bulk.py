@@ -0,0 +1,37 @@
+from app import crud
+
+
+def test_bulk_users_reports_conflicts_and_keeps_the_rest(client, make_user):
+    make_user(0)
+    payload = [make_user.data(0), make_user.data(1), make_user.data(2), make_user.data(3, email="u1@atu.ie")]
+    r = client.post("/api/users:bulk", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert [u["email"] for u in body["created"]] == ["u1@atu.ie", "u2@atu.ie"]
+    assert body["errors"] == [
+        {"index": 0, "detail": "email already exists"},
+        {"index": 3, "detail": "email already exists"},
+    ]
+    assert len(client.get("/api/users").json()) == 3
+
+
+def test_bulk_projects_rejects_unknown_owner(client, make_user):
+    uid = make_user(1)["id"]
+    payload = [{"name": "A", "owner_id": uid}, {"name": "B", "owner_id": 999}, {"name": "C", "owner_id": uid}]
+    body = client.post("/api/projects:bulk", json=payload).json()
+    assert [p["name"] for p in body["created"]] == ["A", "C"]
+    assert body["errors"] == [{"index": 1, "detail": "User not found"}]
+
+
+def test_bulk_courses_across_chunks(client, monkeypatch):
+    monkeypatch.setattr("app.bulk.BULK_CHUNK_SIZE", 2)
+    payload = [{"code": f"C{i % 4}", "name": "Course", "credits": 5} for i in range(6)]
+    body = client.post("/api/courses:bulk", json=payload).json()
+    assert [c["code"] for c in body["created"]] == ["C0", "C1", "C2", "C3"]
+    assert [e["index"] for e in body["errors"]] == [4, 5]
+
+
+def test_bulk_size_limit(client, monkeypatch):
+    monkeypatch.setattr(crud, "BULK_MAX_ITEMS", 1)
+    r = client.post("/api/courses:bulk", json=[{"code": "A", "name": "A", "credits": 1}] * 2)
+    assert r.status_code == 413
@@ -0,0 +1,99 @@
+from sqlalchemy.orm import Session
+
+from app import cache as cache_module
+from app.cache import EntityCache, cache
+from app.models import UserDB
+
+
+def test_repeat_get_is_served_from_cache(client, make_user):
+    user = make_user()
+    first = client.get(f"/api/users/{user['id']}")
+    second = client.get(f"/api/users/{user['id']}")
+    assert second.json() == first.json() == user
+    assert int(first.headers["X-DB-Queries"]) >= 1
+    assert second.headers["X-DB-Queries"] == "0"
+    assert cache.stats()["hits"] == 1
+
+
+def test_misses_are_not_cached(client):
+    assert client.get("/api/users/99").status_code == 404
+    assert client.get("/api/users/99").status_code == 404
+    assert cache.stats()["entries"] == 0
+
+
+def test_patch_invalidates_user(client, make_user):
+    user = make_user()
+    client.get(f"/api/users/{user['id']}")
+    client.patch(f"/api/users/{user['student_id']}", json={"name": "Renamed"})
+    assert client.get(f"/api/users/{user['id']}").json()["name"] == "Renamed"
+
+
+def test_owner_change_invalidates_cached_project(client, make_user):
+    user = make_user()
+    project = client.post("/api/projects", json={"name": "P", "owner_id": user["id"]}).json()
+    assert client.get(f"/api/projects/{project['project_id']}").json()["owner"]["name"] == "U1"
+    client.patch(f"/api/users/{user['student_id']}", json={"name": "Renamed"})
+    assert client.get(f"/api/projects/{project['project_id']}").json()["owner"]["name"] == "Renamed"
+
+
+def test_delete_invalidates_user_and_projects(client, make_user):
+    user = make_user()
+    project = client.post("/api/projects", json={"name": "P", "owner_id": user["id"]}).json()
+    client.get(f"/api/users/{user['id']}")
+    client.get(f"/api/projects/{project['project_id']}")
+    client.delete(f"/api/users/{user['id']}")
+    assert client.get(f"/api/users/{user['id']}").status_code == 404
+    assert client.get(f"/api/projects/{project['project_id']}").status_code == 404
+
+
+def test_get_course(client):
+    course = client.post("/api/courses", json={"code": "CS101", "name": "Intro", "credits": 5}).json()
+    assert client.get(f"/api/courses/{course['id']}").json() == course
+    assert client.get("/api/courses/999").status_code == 404
+
+
+def test_orm_commit_invalidates(client, db_engine, make_user):
+    user = make_user()
+    client.get(f"/api/users/{user['id']}")
+    with Session(db_engine) as db:
+        db.get(UserDB, user["id"]).age = 30
+        db.commit()
+    assert client.get(f"/api/users/{user['id']}").json()["age"] == 30
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    c = EntityCache(ttl=60, max_entries=2, max_bytes=10_000)
+    for i in range(3):
+        c.set(("user", i), {"id": i})
+    assert c.get(("user", 0)) is None
+    assert c.get(("user", 2)) == {"id": 2}
+
+    c = EntityCache(ttl=60, max_entries=100, max_bytes=40)
+    c.set(("user", 1), {"name": "x" * 20})
+    c.set(("user", 2), {"name": "y" * 20})
+    assert c.stats()["entries"] == 1 and c.stats()["bytes"] <= 40
+
+
+def test_entries_expire(monkeypatch):
+    c = EntityCache(ttl=5, max_entries=10, max_bytes=10_000)
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    c.set(("user", 1), {"id": 1})
+    now[0] += 6
+    assert c.get(("user", 1)) is None
+
+
+def test_load_racing_a_write_is_not_stored():
+    c = EntityCache(ttl=60, max_entries=10, max_bytes=10_000)
+    epoch = c.epoch
+    c.invalidate(("user", 1))  # a writer commits while the reader is loading
+    c.set(("user", 1), {"id": 1, "stale": True}, epoch=epoch)
+    assert c.get(("user", 1)) is None
+
+
+def test_admin_cache_endpoints(client, make_user):
+    user = make_user()
+    client.get(f"/api/users/{user['id']}")
+    assert client.get("/admin/cache").json()["entries"] == 1
+    assert client.delete("/admin/cache").status_code == 204
+    assert client.get("/admin/cache").json()["entries"] == 0
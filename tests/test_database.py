@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from app import database
+from app.metrics import POOL_CHECKED_OUT
+
+
+class FlakyEngine:
+    """connect() fails `failures` times, then succeeds."""
+    def __init__(self, failures):
+        self.failures = failures
+
+    def connect(self):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def state(monkeypatch):
+    state = {"ready": False, "attempts": 0, "last_error": None}
+    monkeypatch.setattr(database, "db_state", state)
+    # fake clock: sleeping advances monotonic() instead of waiting
+    clock, sleeps = [0.0], []
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(database.time, "sleep", sleep)
+    monkeypatch.setattr(database.time, "monotonic", lambda: clock[0])
+    state["sleeps"] = sleeps
+    return state
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(database, "DB_RETRY_DELAY", 1.0)
+    monkeypatch.setattr(database, "DB_RETRY_MAX_DELAY", 5.0)
+    delays = [database.backoff_delay(n) for n in range(10) for _ in range(20)]
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_wait_for_db_retries_until_connected(state):
+    database.wait_for_db(FlakyEngine(3), deadline=1000)
+    assert state["ready"] and state["attempts"] == 4
+    assert len(state["sleeps"]) == 3
+    assert state["last_error"] is None
+
+
+def test_wait_for_db_gives_up_at_deadline(state, monkeypatch):
+    monkeypatch.setattr(database, "backoff_delay", lambda attempt: 10.0)
+    with pytest.raises(OperationalError):
+        database.wait_for_db(FlakyEngine(100), deadline=25)
+    assert state["sleeps"] == [10.0, 10.0]
+    assert not state["ready"]
+    assert state["last_error"] == "connection refused"
+
+
+def test_pool_options_follow_env(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(database, "DB_PRE_PING", "always")
+    opts = database.pool_options("postgresql+psycopg://u:p@db/app")
+    assert opts["pool_size"] == 3 and opts["pool_pre_ping"] is True
+    assert opts["poolclass"] is database.TimedQueuePool
+    assert database.pool_options("sqlite+pysqlite://") == {}
+
+
+def test_unknown_pre_ping_mode_fails(monkeypatch):
+    monkeypatch.setattr(database, "DB_PRE_PING", "idel")
+    with pytest.raises(ValueError, match="DB_PRE_PING"):
+        database.pool_options("postgresql+psycopg://u:p@db/app")
+
+
+def test_pool_status_records_checkouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "pool_stats", dict.fromkeys(database.pool_stats, 0))
+    engine = create_engine(f"sqlite:///{tmp_path}/p.db", **database.pool_options(f"sqlite:///{tmp_path}/p.db"))
+    with engine.connect(), engine.connect():
+        status = database.pool_status(engine)
+    assert status["checked_out"] == 2 and status["checkouts"] == 2
+    assert status["checked_out_max"] == 2
+    assert status["wait_seconds_max"] >= 0
+    engine.dispose()
+
+
+@pytest.mark.parametrize("idle_after, expected_pings", [(0, 1), (3600, 0)])
+def test_idle_pre_ping(tmp_path, idle_after, expected_pings):
+    engine = create_engine(f"sqlite:///{tmp_path}/p.db", poolclass=database.TimedQueuePool)
+    pings = []
+    real_ping = engine.dialect.do_ping
+    engine.dialect.do_ping = lambda conn: pings.append(1) or real_ping(conn)
+    database.ping_idle_connections(engine, idle_after)
+    for _ in range(2):  # fresh connection, then the same one reused
+        with engine.connect():
+            pass
+    engine.dispose()
+    assert len(pings) == expected_pings
+
+
+def test_failed_idle_ping_leaves_gauge_balanced(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PRE_PING", "idle")
+    monkeypatch.setattr(database, "DB_PRE_PING_IDLE", 0)
+    url = f"sqlite:///{tmp_path}/p.db"
+    engine = create_engine(url, **database.pool_options(url))
+    database.instrument_pool(engine)
+    before = POOL_CHECKED_OUT._value.get()
+    with engine.connect():
+        pass
+    pings = []
+    def ping(dbapi_conn):
+        pings.append(1)
+        if len(pings) == 1:
+            raise engine.dialect.loaded_dbapi.OperationalError("server closed the connection")
+    monkeypatch.setattr(engine.dialect, "do_ping", ping)
+    with engine.connect():
+        assert POOL_CHECKED_OUT._value.get() == before + 1
+    assert pings and POOL_CHECKED_OUT._value.get() == before
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_async_engine_pool_is_instrumented(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path}/a.db")
+    monkeypatch.setattr(database, "DB_PRE_PING", "idle")
+    monkeypatch.setattr(database, "DB_PRE_PING_IDLE", 0)
+    monkeypatch.setattr(database, "_async_engine", None)
+    engine = database.get_async_engine()
+    assert isinstance(engine.pool, database.TimedAsyncQueuePool)
+    dialect, pings = engine.sync_engine.dialect, []
+    real_ping = dialect.do_ping
+    monkeypatch.setattr(dialect, "do_ping", lambda conn: pings.append(1) or real_ping(conn))
+    seen = []
+
+    async def run():
+        for _ in range(2):  # the second checkout is idle-pinged
+            async with engine.connect() as conn:
+                await conn.exec_driver_sql("SELECT 1")
+                seen.append((POOL_CHECKED_OUT._value.get(), database.pool_status(engine.sync_engine)))
+        await engine.dispose()
+
+    before = POOL_CHECKED_OUT._value.get()
+    checkouts = database.pool_stats["checkouts"]
+    asyncio.run(run())
+    assert [gauge for gauge, _ in seen] == [before + 1] * 2
+    assert POOL_CHECKED_OUT._value.get() == before
+    assert database.pool_stats["checkouts"] == checkouts + 2
+    assert seen[0][1]["async_pool"]["checked_out"] == 1
+    assert pings == [1]
@@ -0,0 +1,33 @@
+from sqlalchemy import event
+
+
+def _user_with_projects(client, make_user, i, n):
+    uid = make_user(i)["id"]
+    for j in range(n):
+        client.post(f"/api/users/{uid}/projects", json={"name": f"P{j}"})
+    return uid
+
+
+def test_delete_user_cascades_in_one_statement(client, db_engine, make_user):
+    uid = _user_with_projects(client, make_user, 1, 5)
+    other = _user_with_projects(client, make_user, 2, 1)
+    statements = []
+    listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+    event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        assert client.delete(f"/api/users/{uid}").status_code == 204
+    finally:
+        event.remove(db_engine, "before_cursor_execute", listener)
+    assert [s.split()[0] for s in statements] == ["DELETE"]
+    assert [p["owner_id"] for p in client.get("/api/projects").json()] == [other]
+    assert client.delete(f"/api/users/{uid}").status_code == 404
+
+
+def test_bulk_delete_reports_missing(client, make_user):
+    a = _user_with_projects(client, make_user, 1, 2)
+    b = _user_with_projects(client, make_user, 2, 0)
+    r = client.request("DELETE", "/api/users", json={"ids": [b, 99, a]})
+    assert r.status_code == 200
+    assert r.json() == {"deleted": sorted([a, b]), "missing": [99]}
+    assert client.get("/api/users").json() == []
+    assert client.get("/api/projects").json() == []
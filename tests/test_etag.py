@@ -0,0 +1,53 @@
+from app.etag import etag_matches
+
+
+def _course(client, code="CS101"):
+    return client.post("/api/courses", json={"code": code, "name": "Intro", "credits": 5}).json()
+
+
+def test_get_has_weak_etag_and_cache_control(client):
+    _course(client)
+    r = client.get("/api/courses")
+    assert r.headers["etag"].startswith('W/"')
+    assert r.headers["cache-control"] == "private, no-cache"
+
+
+def test_if_none_match_gives_304(client):
+    _course(client)
+    etag = client.get("/api/courses").headers["etag"]
+    r = client.get("/api/courses", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert "content-type" not in r.headers
+
+
+def test_etag_changes_with_content(client, make_user):
+    user = make_user(1)
+    url = f"/api/users/{user['id']}/projects"
+    etag = client.get(url).headers["etag"]
+    client.post(url, json={"name": "P"})
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_errors_and_exports_are_not_tagged(client):
+    assert "etag" not in client.get("/api/users/99").headers
+    export = client.get("/api/courses/export")
+    assert export.status_code == 200
+    assert "etag" not in export.headers
+
+
+def test_writes_are_not_tagged(client):
+    r = client.post("/api/courses", json={"code": "CS101", "name": "Intro", "credits": 5})
+    assert "etag" not in r.headers
+
+
+def test_etag_matches():
+    assert etag_matches('W/"a"', 'W/"a"')
+    assert etag_matches('"b", W/"a"', 'W/"a"')
+    assert etag_matches('"a"', 'W/"a"')
+    assert etag_matches("*", 'W/"a"')
+    assert not etag_matches('W/"b"', 'W/"a"')
+    assert not etag_matches(None, 'W/"a"')
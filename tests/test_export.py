@@ -0,0 +1,30 @@
+import csv, io, json
+
+
+def _seed(client, make_user):
+    for i in range(3):
+        make_user(i)
+    client.post("/api/users/1/projects", json={"name": "P1", "description": "a, \"quoted\" one"})
+
+
+def test_export_users_ndjson(client, monkeypatch, make_user):
+    monkeypatch.setattr("app.streaming.EXPORT_BATCH_SIZE", 2)
+    _seed(client, make_user)
+    r = client.get("/api/users/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [u["email"] for u in rows] == ["u0@atu.ie", "u1@atu.ie", "u2@atu.ie"]
+
+
+def test_export_projects_csv(client, make_user):
+    _seed(client, make_user)
+    r = client.get("/api/projects/export", params={"format": "csv"})
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert rows == [{"project_id": "1", "name": "P1", "description": "a, \"quoted\" one", "owner_id": "1",
+                     "version": "1"}]
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/api/courses/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,34 @@
+import pytest
+
+from app import fastjson
+
+
+def _seed(client, make_user):
+    for i in range(5):
+        make_user(i, age=20 + i)
+        client.post(f"/api/users/{i + 1}/projects", json={"name": f"P{i}"})
+
+
+@pytest.mark.parametrize("url, params", [
+    ("/api/users", {}),
+    ("/api/users", {"limit": 2, "offset": 1}),
+    ("/api/users", {"email": "U3@ATU.IE"}),
+    ("/api/users", {"page_size": 2}),
+    ("/api/users", {"page_size": 2, "cursor": "eyJrIjoyfQ"}),
+    ("/api/projects", {}),
+    ("/api/projects", {"page_size": 3}),
+])
+def test_fast_path_matches_validated_path(client, monkeypatch, url, params, make_user):
+    _seed(client, make_user)
+    monkeypatch.setattr(fastjson, "FAST_JSON_ROUTES", set())
+    slow = client.get(url, params=params).json()
+    monkeypatch.setattr(fastjson, "FAST_JSON_ROUTES", {"list_users", "list_projects"})
+    fast = client.get(url, params=params)
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == slow
+
+
+def test_routes_are_selected_individually(monkeypatch):
+    monkeypatch.setattr(fastjson, "FAST_JSON_ROUTES", {"list_users"})
+    assert fastjson.use_fast_json("list_users")
+    assert not fastjson.use_fast_json("list_projects")
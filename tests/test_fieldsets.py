@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import event
+
+
+def _seed(client, make_user, users=3, projects_each=2):
+    for i in range(users):
+        uid = make_user(i)["id"]
+        for j in range(projects_each):
+            client.post(f"/api/users/{uid}/projects", json={"name": f"P{i}.{j}"})
+
+
+@pytest.fixture
+def statements(db_engine):
+    seen = []
+    def capture(conn, cursor, statement, *args):
+        seen.append(statement)
+    event.listen(db_engine, "before_cursor_execute", capture)
+    yield seen
+    event.remove(db_engine, "before_cursor_execute", capture)
+
+
+def test_fields_narrow_the_select(client, statements, make_user):
+    _seed(client, make_user)
+    statements.clear()
+    r = client.get("/api/users/1", params={"fields": "name"})
+    assert r.json() == {"id": 1, "name": "U0"}
+    select_sql = next(s for s in statements if s.startswith("SELECT"))
+    assert "email" not in select_sql and "student_id" not in select_sql
+
+
+def test_user_with_projects_in_one_request(client, max_queries, make_user):
+    _seed(client, make_user)
+    r = client.get("/api/users/2", params={"expand": "projects"})
+    max_queries(r, 2)
+    body = r.json()
+    assert body["email"] == "u1@atu.ie"
+    assert [p["name"] for p in body["projects"]] == ["P1.0", "P1.1"]
+
+
+def test_list_expand_is_not_n_plus_one(client, max_queries, make_user):
+    _seed(client, make_user, users=5)
+    r = client.get("/api/users", params={"fields": "name", "expand": "projects"})
+    max_queries(r, 2)
+    assert [len(u["projects"]) for u in r.json()] == [2] * 5
+    assert set(r.json()[0]) == {"id", "name", "projects"}
+
+
+def test_projects_expand_owner_with_paging(client, max_queries, make_user):
+    _seed(client, make_user)
+    r = client.get("/api/projects", params={"fields": "name", "expand": "owner", "page_size": 4})
+    max_queries(r, 2)
+    page = r.json()
+    assert page["next_cursor"]
+    assert page["items"][0] == {"project_id": 1, "name": "P0.0", "owner": page["items"][0]["owner"]}
+    assert page["items"][0]["owner"]["email"] == "u0@atu.ie"
+
+
+def test_get_project_fields(client, make_user):
+    _seed(client, make_user)
+    assert client.get("/api/projects/3", params={"fields": "owner_id"}).json() == {"project_id": 3, "owner_id": 2}
+    assert client.get("/api/projects/99", params={"fields": "name"}).status_code == 404
+
+
+def test_unknown_fields_and_expansions_are_400(client):
+    assert client.get("/api/users", params={"fields": "name,password"}).status_code == 400
+    assert client.get("/api/users/1", params={"expand": "owner"}).status_code == 400
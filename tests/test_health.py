@@ -1,4 +1,72 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from app import health
+
+
 def test_health(client):
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_health_cache(monkeypatch):
+    monkeypatch.setitem(health._cache, "at", float("-inf"))
+
+
+def test_live(client):
+    assert client.get("/health/live").json() == {"status": "ok"}
+
+
+def test_ready_checks_db(client, monkeypatch):
+    monkeypatch.delenv("OTHER_API_BASE", raising=False)
+    r = client.get("/health/ready")
+    assert r.status_code == 200
+    assert r.json()["checks"]["db"] == {"ok": True}
+
+
+def test_ready_is_cached(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(health, "run_checks", lambda: calls.append(1) or (False, {}))
+    monkeypatch.setattr(health, "HEALTH_CACHE_TTL", 60)
+    assert client.get("/health/ready").status_code == 503
+    assert client.get("/health/ready").status_code == 503
+    assert len(calls) == 1
+
+
+def test_pool_saturation(tmp_path, monkeypatch):
+    monkeypatch.setattr(health, "HEALTH_POOL_MAX_SATURATION", 0.5)
+    engine = create_engine(f"sqlite:///{tmp_path}/p.db", poolclass=QueuePool, pool_size=2, max_overflow=0)
+    assert health.check_pool(engine)["ok"]
+    conn = engine.connect()
+    try:
+        assert health.check_pool(engine) == {"ok": False, "checked_out": 1, "capacity": 2, "saturation": 0.5}
+    finally:
+        conn.close()
+        engine.dispose()
+
+
+def test_ready_checks_async_pool(client, tmp_path, monkeypatch):
+    monkeypatch.delenv("OTHER_API_BASE", raising=False)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/a.db", pool_size=2, max_overflow=0)
+    monkeypatch.setattr(health, "peek_async_engine", lambda: async_engine)
+    monkeypatch.setattr(health, "HEALTH_POOL_MAX_SATURATION", 0.0)
+    r = client.get("/health/ready")
+    assert r.status_code == 503 and r.json()["checks"]["async_pool"]["capacity"] == 2
+
+
+def test_unreachable_other_api_fails_only_when_required(client, monkeypatch):
+    monkeypatch.setenv("OTHER_API_BASE", "http://127.0.0.1:9")
+    r = client.get("/health/ready")
+    assert r.status_code == 200 and r.json()["checks"]["other_api"]["ok"] is False
+    monkeypatch.setattr(health, "HEALTH_REQUIRE_OTHER_API", True)
+    monkeypatch.setitem(health._cache, "at", float("-inf"))
+    assert client.get("/health/ready").status_code == 503
+
+
+def test_pool_endpoint(client):
+    body = client.get("/health/pool").json()
+    assert {"pool", "checkouts", "wait_seconds_max"} <= body.keys()
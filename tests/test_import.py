@@ -0,0 +1,49 @@
+import json
+from app import importer
+
+
+def test_import_users_csv_reports_rejected_rows(client, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_CHUNK_SIZE", 2)
+    client.post("/api/users", json={"name": "Old", "email": "old@atu.ie", "age": 30, "student_id": "S0000009"})
+    body = (
+        "name,email,age,student_id\n"
+        "Ann,ann@atu.ie,21,S0000001\n"
+        "Bob,not-an-email,22,S0000002\n"
+        "Cat,old@atu.ie,23,S0000003\n"
+        "Dan,dan@atu.ie,24,S0000004\n"
+        "Dup,dan@atu.ie,25,S0000005\n"
+    )
+    r = client.post("/api/users:import", params={"format": "csv"}, content=body.encode())
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["accepted"], report["rejected"]) == (2, 3)
+    assert [e["line"] for e in report["errors"]] == [3, 4, 6]
+    assert "email" in report["errors"][0]["detail"]
+    assert len(client.get("/api/users").json()) == 3
+
+
+def test_import_projects_ndjson(client):
+    uid = client.post("/api/users", json={"name": "A", "email": "a@atu.ie", "age": 20, "student_id": "S0000001"}).json()["id"]
+    lines = [
+        json.dumps({"name": "P1", "owner_id": uid}),
+        "{broken",
+        json.dumps({"name": "P2", "owner_id": 999}),
+        json.dumps({"name": "P3", "description": "x", "owner_id": uid}),
+    ]
+    r = client.post("/api/projects:import", content="\n".join(lines).encode())
+    report = r.json()
+    assert (report["accepted"], report["rejected"]) == (2, 2)
+    assert [p["name"] for p in client.get("/api/projects").json()] == ["P1", "P3"]
+
+
+def test_aiter_lines_handles_split_multibyte_chars():
+    import anyio
+
+    async def chunks():
+        for part in ["é,1\nsecond".encode()[:1], "é,1\nsecond".encode()[1:]]:
+            yield part
+
+    async def collect():
+        return [line async for line in importer.aiter_lines(chunks())]
+
+    assert anyio.run(collect) == ["é,1\n", "second"]
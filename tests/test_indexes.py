@@ -0,0 +1,79 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import get_db
+from app.models import Base
+from app.pagination import encode_cursor
+
+# Postgres leg runs only when pointed at a scratch database
+PG_URL = os.getenv("TEST_POSTGRES_URL")
+
+ROUTES = [
+    "/api/users/1/projects",
+    "/api/users?email=U1@ATU.IE",
+    "/api/users/1",
+    "/api/projects/1",
+    f"/api/projects?cursor={encode_cursor(1)}",
+]
+
+
+@pytest.fixture(params=["sqlite", pytest.param("postgresql", marks=pytest.mark.skipif(
+    not PG_URL, reason="TEST_POSTGRES_URL not set"))])
+def explain_env(request, client, db_engine):
+    if request.param == "sqlite":
+        yield client, db_engine
+        return
+    engine = create_engine(PG_URL)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    def override_get_db():
+        with Session() as db:
+            yield db
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c, engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _plan(conn, sql, params):
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+        return [r[-1] for r in rows]
+    # tiny test tables: make the planner show whether an index *can* be used
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    return [r[0] for r in conn.exec_driver_sql("EXPLAIN " + sql, params).all()]
+
+
+def _uses_index(plan):
+    # full table scans show up as "SCAN <table>" (SQLite) / "Seq Scan" (Postgres)
+    return not any(line.startswith("SCAN") or "Seq Scan" in line for line in plan)
+
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_route_queries_use_an_index(explain_env, route):
+    client, engine = explain_env
+    uid = client.post("/api/users", json={
+        "name": "U", "email": "u1@atu.ie", "age": 20, "student_id": "S0000001",
+    }).json()["id"]
+    client.post(f"/api/users/{uid}/projects", json={"name": "P"})
+
+    seen = []
+    listener = lambda conn, cur, sql, params, *a: seen.append((sql, params))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get(route.replace("/1", f"/{uid}", 1)).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    selects = [(sql, params) for sql, params in seen if sql.lstrip().upper().startswith("SELECT")]
+    assert selects
+    with engine.connect() as conn:
+        for sql, params in selects:
+            plan = _plan(conn, sql, params)
+            assert _uses_index(plan), (sql, plan)
@@ -0,0 +1,110 @@
+import os, time
+import pytest
+from sqlalchemy import create_engine
+
+from app.cache import EntityCache, cache
+from app import invalidation
+from app.invalidation import Broadcaster, FileBroadcaster, PostgresBroadcaster
+
+PG_URL = os.getenv("TEST_POSTGRES_URL")
+KEY = ("user", 1)
+
+
+def _cache(*keys):
+    c = EntityCache(ttl=60, max_entries=100, max_bytes=100_000)
+    for key in keys:
+        c.set(key, {"id": key[1]})
+    return c
+
+
+def _eventually(check, timeout=3.0):
+    give_up_at = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < give_up_at, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def workers(request):
+    """Two broadcasters standing in for two workers sharing a channel."""
+    started = []
+
+    def make(cls, *args, **kwargs):
+        b = cls(*args, target=_cache(KEY, ("user", 2)), **kwargs)
+        b.start()
+        started.append(b)
+        return b
+    yield make
+    for b in started:
+        b.stop()
+
+
+def test_file_invalidation_reaches_other_worker(workers, tmp_path):
+    path = str(tmp_path / "invalidation.log")
+    a = workers(FileBroadcaster, path, poll=0.01)
+    b = workers(FileBroadcaster, path, poll=0.01)
+    a.target.invalidate(KEY)
+    _eventually(lambda: b.target.get(KEY) is None)
+    assert b.target.get(("user", 2)) is not None
+    # b doesn't re-apply or re-broadcast a's message
+    assert a.target.get(("user", 2)) is not None
+
+
+def test_file_rotation_clears_readers(workers, tmp_path):
+    path = str(tmp_path / "invalidation.log")
+    a = workers(FileBroadcaster, path, poll=0.01, max_bytes=1)
+    b = workers(FileBroadcaster, path, poll=0.01, max_bytes=1)
+    a.target.invalidate(KEY)
+    _eventually(lambda: b.target.get(KEY) is None)
+    time.sleep(0.05)  # let b catch up to the end of the file
+    b.target.set(KEY, {"id": 1})
+    a.target.invalidate(("user", 3))  # rotates the file first
+    _eventually(lambda: b.target.stats()["entries"] == 0)
+
+
+def test_partial_lines_wait_for_the_rest(tmp_path):
+    path = tmp_path / "invalidation.log"
+    b = FileBroadcaster(str(path), target=_cache(KEY))
+    with open(path, "a") as f:
+        f.write('{"origin": "x", "keys": [["user", 1]]')
+    b._read_new()
+    assert b.target.get(KEY) is not None
+    with open(path, "a") as f:
+        f.write("}\n")
+    b._read_new()
+    assert b.target.get(KEY) is None
+
+
+def test_start_rejects_bad_config(monkeypatch):
+    engine = create_engine("sqlite+pysqlite://")
+    monkeypatch.setattr(invalidation, "CACHE_INVALIDATION", "file")
+    monkeypatch.setattr(invalidation, "CACHE_INVALIDATION_FILE", "")
+    with pytest.raises(ValueError, match="CACHE_INVALIDATION_FILE"):
+        invalidation.start(engine)
+    monkeypatch.setattr(invalidation, "CACHE_INVALIDATION", "redis")
+    with pytest.raises(ValueError, match="CACHE_INVALIDATION="):
+        invalidation.start(engine)
+    with pytest.raises(TypeError):
+        Broadcaster()
+
+
+def test_write_handlers_publish(client, monkeypatch, make_user):
+    published = []
+    monkeypatch.setattr(cache, "broadcast", published.append)
+    user = make_user(1)
+    client.patch(f"/api/users/{user['student_id']}", json={"age": 21})
+    client.delete(f"/api/users/{user['id']}")
+    assert published == [[("user", user["id"])], [("user", user["id"])]]
+
+
+@pytest.mark.skipif(not PG_URL, reason="TEST_POSTGRES_URL not set")
+def test_postgres_notify_reaches_other_worker(workers):
+    engine = create_engine(PG_URL)
+    a = workers(PostgresBroadcaster, engine, channel="cache_invalidation_test")
+    b = workers(PostgresBroadcaster, engine, channel="cache_invalidation_test")
+    time.sleep(0.5)  # both LISTENing
+    for worker in (a, b):
+        worker.target.set(KEY, {"id": 1})
+    a.target.invalidate(KEY)
+    _eventually(lambda: b.target.get(KEY) is None)
+    engine.dispose()
@@ -0,0 +1,42 @@
+import os, subprocess, sys
+
+
+def _sample(text, name, **labels):
+    want = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{") and all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name}{{{want}}} not found")
+
+
+def test_requests_are_labelled_by_route_template(client):
+    before = client.get("/metrics").text
+    client.get("/api/users/41")
+    client.get("/api/users/42")
+    text = client.get("/metrics").text
+    labels = dict(method="GET", route="/api/users/{user_id}", status="404")
+    count = _sample(text, "http_requests_total", **labels)
+    try:
+        count -= _sample(before, "http_requests_total", **labels)
+    except AssertionError:
+        pass
+    assert count == 2
+    assert _sample(text, "http_request_duration_seconds_count", **labels) >= 2
+    assert 'route="/api/users/41"' not in text
+
+
+def test_unmatched_paths_share_one_label(client):
+    client.get("/no/such/path")
+    assert _sample(client.get("/metrics").text, "http_requests_total",
+                   route="<unmatched>", status="404") >= 1
+
+
+def test_multiprocess_aggregation(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    bump = "from app.metrics import REQUESTS; REQUESTS.labels('GET', '/x', '200').inc()"
+    for _ in range(2):  # two "workers"
+        subprocess.run([sys.executable, "-c", bump], env=env, check=True)
+    scrape = "from app.metrics import metrics; print(metrics().body.decode())"
+    out = subprocess.run([sys.executable, "-c", scrape], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    assert _sample(out, "http_requests_total", route="/x") == 2
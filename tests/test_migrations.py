@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+from app import migrations
+from app.models import Base
+
+
+@pytest.fixture
+def fresh_engine():
+    engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+def _shape(engine):
+    insp = inspect(engine)
+    with engine.connect() as conn:
+        # sqlite_master also lists expression indexes, which reflection skips
+        indexes = set(conn.exec_driver_sql(
+            "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").all())
+    return {
+        t: (sorted(c["name"] for c in insp.get_columns(t)), sorted(n for tbl, n in indexes if tbl == t))
+        for t in Base.metadata.tables
+    }
+
+
+def test_upgrade_builds_the_model_schema(fresh_engine):
+    assert migrations.upgrade(fresh_engine) == [m.version for m in migrations.MIGRATIONS]
+    model_engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(model_engine)
+    assert _shape(fresh_engine) == _shape(model_engine)
+    model_engine.dispose()
+
+
+def test_upgrade_is_idempotent(fresh_engine):
+    migrations.upgrade(fresh_engine)
+    assert migrations.upgrade(fresh_engine) == []
+
+
+def test_verify_schema_rejects_old_database(fresh_engine):
+    with pytest.raises(RuntimeError, match="version 0"):
+        migrations.verify_schema(fresh_engine)
+    migrations.upgrade(fresh_engine, target=1)
+    with pytest.raises(RuntimeError, match="version 1"):
+        migrations.verify_schema(fresh_engine)
+    migrations.upgrade(fresh_engine)
+    migrations.verify_schema(fresh_engine)
+
+
+def test_upgrade_adopts_pre_migration_database(fresh_engine):
+    # databases created by the old import-time create_all have no version table
+    Base.metadata.create_all(fresh_engine)
+    migrations.upgrade(fresh_engine)
+    migrations.verify_schema(fresh_engine)
+
+
+def test_v3_adds_versions_to_existing_rows(fresh_engine):
+    migrations.upgrade(fresh_engine, target=2)
+    with fresh_engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO courses (code, name, credits) VALUES ('C1', 'C', 5)")
+    migrations.upgrade(fresh_engine)
+    with fresh_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT version FROM courses").scalar() == 1
+
+
+def test_v4_indexes_existing_projects(fresh_engine):
+    migrations.upgrade(fresh_engine, target=3)
+    with fresh_engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (name, email, age, student_id) VALUES ('A', 'a@x.ie', 20, 'S0000001')")
+        conn.exec_driver_sql("INSERT INTO projects (name, owner_id) VALUES ('Telescope mirror', 1)")
+    migrations.upgrade(fresh_engine)
+    with fresh_engine.connect() as conn:
+        hits = conn.exec_driver_sql("SELECT rowid FROM projects_fts WHERE projects_fts MATCH 'telescope'").all()
+    assert hits == [(1,)]
@@ -0,0 +1,68 @@
+from app import fastjson, pagination
+
+
+def test_cursor_pages_cover_all_rows(client, make_user):
+    for i in range(7):
+        make_user(i)
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 3}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/users", params=params).json()
+        seen += [u["id"] for u in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 7
+
+
+def test_page_size_is_capped(client, monkeypatch, make_user):
+    monkeypatch.setattr(pagination, "MAX_PAGE_SIZE", 2)
+    for i in range(3):
+        make_user(i)
+    body = client.get("/api/users", params={"page_size": 50}).json()
+    assert len(body["items"]) == 2
+    assert body["next_cursor"] is not None
+
+
+def test_legacy_limit_offset_still_returns_list(client):
+    for i in range(3):
+        client.post("/api/courses", json={"code": f"C{i}", "name": f"Course {i}", "credits": 5})
+    r = client.get("/api/courses", params={"limit": 2, "offset": 1})
+    assert [c["code"] for c in r.json()] == ["C1", "C2"]
+
+
+def test_bad_cursor_is_400(client):
+    assert client.get("/api/projects", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_cursor_key_must_be_an_id(client):
+    for key in ([1], {"a": 1}, "1", True, 1.5):
+        r = client.get("/api/users", params={"cursor": pagination.encode_cursor(key)})
+        assert r.status_code == 400, key
+
+
+def test_unpaged_list_gets_default_page(client, monkeypatch, make_user):
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+    for i in range(3):
+        make_user(i)
+    assert len(client.get("/api/users").json()) == 2
+    assert len(client.get("/api/users", params={"expand": "projects"}).json()) == 2
+    assert len(client.get("/api/users", params={"limit": 3}).json()) == 3
+
+
+def test_capped_unpaged_list_links_to_the_rest(client, monkeypatch, make_user):
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+    for i in range(3):
+        make_user(i)
+        client.post("/api/projects", json={"name": f"P{i}", "owner_id": i + 1})
+    for path in ("/api/users", "/api/projects"):
+        r = client.get(path)
+        assert len(r.json()) == 2 and r.links["next"]["url"].endswith("limit=2&offset=2")
+        r = client.get(r.links["next"]["url"])
+        assert len(r.json()) == 1 and "Link" not in r.headers
+    assert "Link" in client.get("/api/users", params={"fields": "name"}).headers
+    assert "Link" not in client.get("/api/users", params={"limit": 3}).headers
+    monkeypatch.setattr(fastjson, "FAST_JSON_ROUTES", set())
+    assert "Link" in client.get("/api/users").headers
@@ -0,0 +1,75 @@
+import logging
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import query_stats
+from app.database import get_db
+from app.main import app as main_app
+from app.models import ProjectDB
+from app.query_stats import fingerprint
+
+# (method, path, json body from the seeded ids, max statements)
+BUDGETS = [
+    ("GET", "/api/users", None, 1),
+    ("GET", "/api/users/{uid}", None, 1),
+    ("GET", "/api/users/{uid}/projects", None, 1),
+    ("GET", "/api/projects", None, 1),
+    ("GET", "/api/projects/{pid}", None, 2),  # project + selectinload(owner)
+    ("GET", "/api/courses", None, 1),
+    ("POST", "/api/projects", lambda ids: {"name": "N", "owner_id": ids["uid"]}, 2),
+    ("PATCH", "/api/projects/{pid}", lambda ids: {"name": "renamed"}, 1),
+    ("PATCH", "/api/users/S0000001", lambda ids: {"age": 33}, 1),
+    ("DELETE", "/api/users/{uid}", None, 1),
+]
+
+
+@pytest.fixture
+def seeded(client, make_user):
+    uid = make_user(1)["id"]
+    pid = None
+    for i in range(3):
+        pid = client.post(f"/api/users/{uid}/projects", json={"name": f"P{i}"}).json()["project_id"]
+    return {"uid": uid, "pid": pid}
+
+
+@pytest.mark.parametrize("method, path, body, budget", BUDGETS)
+def test_query_budget(client, seeded, max_queries, method, path, body, budget):
+    r = client.request(method, path.format(**seeded), json=body(seeded) if body else None)
+    assert r.status_code < 400
+    max_queries(r, budget)
+    assert r.headers["X-DB-Time"].endswith("ms")
+
+
+def test_n_plus_one_is_logged(client, make_user, caplog):
+    # one project per owner, at the default threshold: listing them and reading
+    # each owner lazily is one users SELECT per row
+    n = query_stats.N_PLUS_ONE_THRESHOLD
+    for i in range(n):
+        uid = make_user(i)["id"]
+        client.post(f"/api/users/{uid}/projects", json={"name": f"P{i}"})
+    app = FastAPI()
+    app.add_middleware(query_stats.QueryCountMiddleware)
+    app.dependency_overrides = main_app.dependency_overrides
+
+    @app.get("/owners")
+    def owners(db: Session = Depends(get_db)):
+        return [p.owner.name for p in db.execute(select(ProjectDB)).scalars()]
+
+    with caplog.at_level(logging.WARNING, logger="app.queries"):
+        r = TestClient(app).get("/owners")
+    assert len(r.json()) == n and r.headers["X-DB-Queries"] == str(n + 1)
+    [warning] = [rec for rec in caplog.records if rec.getMessage().startswith("possible N+1")]
+    method, path, count, shape = warning.args
+    assert (method, path, count) == ("GET", "/owners", n)
+    assert shape.startswith("SELECT users.id") and shape.endswith("FROM users WHERE users.id = ?")
+
+
+def test_fingerprint_ignores_literals_and_list_length():
+    a = fingerprint("SELECT * FROM users WHERE id IN (?, ?, ?) AND name = 'bob'")
+    b = fingerprint("SELECT *  FROM users\nWHERE id IN (%(id_1)s) AND name = 'al''ice'")
+    assert a == b == "SELECT * FROM users WHERE id IN (...) AND name = ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == \
+        "INSERT INTO t (a, b) VALUES (?, ?), ..."
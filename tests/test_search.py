@@ -0,0 +1,77 @@
+import pytest
+
+from app.pagination import encode_cursor
+
+
+@pytest.fixture
+def projects(client, make_user):
+    uid = make_user(1)["id"]
+    rows = [
+        ("Rocket telemetry", "Ground station for rocket launches"),
+        ("Weather station", "Logs rainfall; no rockets here"),
+        ("Garden planner", "Plans planting"),
+        ("Rocket engine test stand", None),
+        ("Rocketry club site", "Club website"),
+    ]
+    for name, desc in rows:
+        client.post(f"/api/users/{uid}/projects", json={"name": name, "description": desc})
+    return uid
+
+
+def _search(client, q, **params):
+    r = client.get("/api/projects/search", params={"q": q, **params})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_ranked_with_highlights(client, projects):
+    items = _search(client, "rocket")["items"]
+    # stemming matches "rockets"; name hits outrank the description-only hit
+    assert {i["name"] for i in items} == {"Rocket telemetry", "Weather station", "Rocket engine test stand"}
+    assert items[-1]["name"] == "Weather station"
+    hit = next(i for i in items if i["name"] == "Rocket telemetry")
+    assert hit["highlights"]["name"] == "<mark>Rocket</mark> telemetry"
+    assert "<mark>rocket</mark>" in hit["highlights"]["description"]
+    assert [i["score"] for i in items] == sorted(i["score"] for i in items)
+
+
+def test_all_words_must_match(client, projects):
+    assert [i["name"] for i in _search(client, "rocket telemetry")["items"]] == ["Rocket telemetry"]
+    assert _search(client, "submarine")["items"] == []
+
+
+def test_keyset_pages_cover_all_hits(client, projects):
+    everything = [i["project_id"] for i in _search(client, "rocket")["items"]]
+    seen, cursor = [], None
+    while True:
+        page = _search(client, "rocket", page_size=1, **({"cursor": cursor} if cursor else {}))
+        seen += [i["project_id"] for i in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == everything
+
+
+def test_index_follows_writes(client, projects):
+    client.patch("/api/projects/3", json={"name": "Rocket garden"})
+    assert "Rocket garden" in {i["name"] for i in _search(client, "rocket")["items"]}
+    client.delete(f"/api/users/{projects}")  # cascades to the projects
+    assert _search(client, "rocket")["items"] == []
+
+
+def test_query_syntax_is_not_interpreted(client, projects):
+    assert _search(client, 'rocket" OR garden*')["items"] == []
+    assert client.get("/api/projects/search", params={"q": "!!"}).status_code == 400
+    for key in (1, ["x", {"a": 1}], [0.5, 1.5], [0.5, True]):
+        cursor = encode_cursor(key)
+        r = client.get("/api/projects/search", params={"q": "rocket", "cursor": cursor})
+        assert r.status_code == 400, key
+
+
+def test_highlights_escape_project_text(client, projects):
+    client.post(f"/api/users/{projects}/projects", json={
+        "name": "<script>alert(1)</script> rocket", "description": "a & b <b>rocket</b>",
+    })
+    hit = next(i for i in _search(client, "rocket")["items"] if "script" in i["name"])
+    assert hit["highlights"]["name"] == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>rocket</mark>"
+    assert hit["highlights"]["description"] == "a &amp; b &lt;b&gt;<mark>rocket</mark>&lt;/b&gt;"
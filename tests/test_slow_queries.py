@@ -0,0 +1,69 @@
+import logging
+import pytest
+
+from app import slow_queries
+
+
+@pytest.fixture(autouse=True)
+def _empty_table():
+    slow_queries.reset()
+    yield
+    slow_queries.reset()
+
+
+def test_report_groups_by_fingerprint(client, make_user):
+    for i in range(3):
+        make_user(i)
+    for i in range(1, 4):
+        client.get(f"/api/users/{i}")
+    report = client.get("/admin/slow-queries", params={"order": "total"}).json()
+    by_shape = {r["fingerprint"]: r for r in report}
+    select_one = next(r for shape, r in by_shape.items()
+                      if shape.startswith("SELECT") and "WHERE users.id = ?" in shape)
+    assert select_one["count"] == 3
+    assert select_one["p50_ms"] <= select_one["p95_ms"] <= select_one["max_ms"]
+
+
+def test_slow_selects_are_logged_with_plan(client, caplog, monkeypatch, make_user):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_MS", 1e-9)
+    for i in range(3):
+        make_user(i)
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        client.get("/api/users", params={"email": "U1@atu.ie"})
+    assert "slow query" in caplog.text
+    plans = [r["plan"] for r in slow_queries.top(50) if r["plan"]]
+    assert any("ix_users_email_lower" in p for p in plans)
+
+
+def test_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_TABLE_SIZE", 2)
+    for table in ("a", "b", "c"):
+        slow_queries.record(None, "", f"SELECT * FROM {table}", None, False, 0.001)
+    # least recently seen shape is evicted
+    assert {r["fingerprint"] for r in slow_queries.top()} == {"SELECT * FROM b", "SELECT * FROM c"}
+
+
+def test_admin_token(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/slow-queries").status_code == 403
+    assert client.get("/admin/slow-queries", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_admin_refused_without_token(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    monkeypatch.setenv("ADMIN_OPEN", "false")
+    assert client.get("/admin/slow-queries").status_code == 403
+    assert client.delete("/admin/cache").status_code == 403
+    monkeypatch.setenv("ADMIN_OPEN", "true")
+    assert client.get("/admin/slow-queries").status_code == 200
+
+
+def test_plan_is_captured_once_per_fingerprint(monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN_MS", 1e-9)
+    explained = []
+    monkeypatch.setattr(slow_queries, "_explain", lambda *args: explained.append(args) or "plan")
+    for _ in range(3):
+        slow_queries.record(None, "SELECT 1", "SELECT ?", None, False, 0.001)
+    assert len(explained) == 1 and slow_queries.top()[0]["plan"] == "plan"
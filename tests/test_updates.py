@@ -0,0 +1,31 @@
+def test_put_and_patch_user_by_student_id(client, make_user):
+    make_user(1)
+    r = client.put("/api/users/S0000001", json={
+        "name": "Renamed", "email": "new@atu.ie", "age": 30, "student_id": "S0000001",
+    })
+    assert r.status_code == 200 and r.json()["name"] == "Renamed"
+    r = client.patch("/api/users/S0000001", json={"age": 31})
+    assert r.json()["age"] == 31 and r.json()["email"] == "new@atu.ie"
+    assert client.patch("/api/users/S0000001", json={}).json()["age"] == 31
+
+
+def test_update_missing_rows_is_404(client):
+    assert client.patch("/api/users/S9999999", json={"age": 1}).status_code == 404
+    assert client.patch("/api/users/S9999999", json={}).status_code == 404
+    assert client.put("/api/projects/42", json={"name": "x", "owner_id": 1}).status_code == 404
+    assert client.patch("/api/projects/42", json={"name": "x"}).status_code == 404
+
+
+def test_update_to_duplicate_email_is_409(client, make_user):
+    make_user(1)
+    make_user(2)
+    assert client.patch("/api/users/S0000002", json={"email": "u1@atu.ie"}).status_code == 409
+    # the failed write must not leak into the next request
+    assert client.get("/api/users/2").json()["email"] == "u2@atu.ie"
+
+
+def test_patch_project_returns_updated_row(client, make_user):
+    uid = make_user(1)["id"]
+    pid = client.post("/api/projects", json={"name": "P", "owner_id": uid}).json()["project_id"]
+    r = client.patch(f"/api/projects/{pid}", json={"description": "desc"})
+    assert r.json() == {"project_id": pid, "name": "P", "description": "desc", "owner_id": uid, "version": 2}
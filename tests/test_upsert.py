@@ -0,0 +1,39 @@
+from app import bulk
+
+
+def _catalog(*rows):
+    return [{"code": c, "name": n, "credits": cr} for c, n, cr in rows]
+
+
+def test_upsert_counts(client):
+    client.post("/api/courses", json={"code": "C1", "name": "One", "credits": 5})
+    client.post("/api/courses", json={"code": "C2", "name": "Two", "credits": 5})
+    r = client.put("/api/courses:upsert", json=_catalog(("C1", "One", 5), ("C2", "Two", 10), ("C3", "Three", 5)))
+    assert r.status_code == 200
+    assert r.json() == {"inserted": 1, "updated": 1, "unchanged": 1, "errors": []}
+    courses = {c["code"]: c for c in client.get("/api/courses").json()}
+    assert courses["C2"]["credits"] == 10 and courses["C2"]["version"] == 2
+    assert courses["C1"]["version"] == 1
+    assert courses["C3"]["name"] == "Three"
+
+
+def test_identical_catalog_writes_nothing(client, monkeypatch):
+    catalog = _catalog(*((f"C{i}", f"Course {i}", 5) for i in range(10)))
+    client.put("/api/courses:upsert", json=catalog)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 4)
+    r = client.put("/api/courses:upsert", json=catalog)
+    assert r.json()["unchanged"] == 10
+    assert {c["version"] for c in client.get("/api/courses", params={"limit": 100}).json()} == {1}
+
+
+def test_upsert_invalidates_cached_course(client):
+    cid = client.post("/api/courses", json={"code": "C1", "name": "One", "credits": 5}).json()["id"]
+    client.get(f"/api/courses/{cid}")
+    client.put("/api/courses:upsert", json=_catalog(("C1", "Renamed", 5)))
+    assert client.get(f"/api/courses/{cid}").json()["name"] == "Renamed"
+
+
+def test_repeated_codes_are_reported(client):
+    r = client.put("/api/courses:upsert", json=_catalog(("C1", "One", 5), ("C1", "Again", 5)))
+    assert r.json()["inserted"] == 1
+    assert r.json()["errors"] == [{"index": 1, "detail": "code repeats an earlier item"}]
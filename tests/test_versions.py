@@ -0,0 +1,65 @@
+def test_new_rows_start_at_version_1(client, make_user):
+    user = make_user()
+    course = client.post("/api/courses", json={"code": "C1", "name": "C", "credits": 5}).json()
+    assert user["version"] == course["version"] == 1
+    assert client.get(f"/api/users/{user['id']}").headers["etag"] == '"1"'
+
+
+def test_updates_bump_version(client, make_user):
+    make_user()
+    r = client.patch("/api/users/S0000001", json={"age": 21})
+    assert r.json()["version"] == 2 and r.headers["etag"] == '"2"'
+    r = client.put("/api/users/S0000001", json={
+        "name": "U1", "email": "u1@atu.ie", "age": 22, "student_id": "S0000001",
+    })
+    assert r.json()["version"] == 3
+
+
+def test_if_match_guards_updates(client, make_user):
+    make_user()
+    assert client.patch("/api/users/S0000001", json={"age": 21}, headers={"If-Match": '"1"'}).status_code == 200
+    # a second editor still holding version 1 loses
+    r = client.patch("/api/users/S0000001", json={"age": 99}, headers={"If-Match": '"1"'})
+    assert r.status_code == 412
+    assert client.get("/api/users/1").json()["age"] == 21
+    assert client.patch("/api/users/S0000001", json={}, headers={"If-Match": '"1"'}).status_code == 412
+    assert client.patch("/api/users/S0000001", json={"age": 23}, headers={"If-Match": '"9", "2"'}).status_code == 200
+    assert client.patch("/api/users/S0000001", json={"age": 24}, headers={"If-Match": "*"}).status_code == 200
+    # weak tags never satisfy If-Match
+    assert client.patch("/api/users/S0000001", json={"age": 25}, headers={"If-Match": 'W/"4"'}).status_code == 412
+
+
+def test_if_match_on_missing_row_is_404(client):
+    r = client.patch("/api/users/S9999999", json={"age": 1}, headers={"If-Match": '"1"'})
+    assert r.status_code == 404
+    r = client.put("/api/projects/42", json={"name": "x", "owner_id": 1}, headers={"If-Match": '"1"'})
+    assert r.status_code == 404
+
+
+def test_project_etag_round_trips_into_if_match(client, make_user):
+    uid = make_user()["id"]
+    pid = client.post("/api/projects", json={"name": "P", "owner_id": uid}).json()["project_id"]
+    etag = client.get(f"/api/projects/{pid}").headers["etag"]
+    assert etag == '"1.1"'  # project version, owner version
+    r = client.put(f"/api/projects/{pid}", json={"name": "Q", "owner_id": uid}, headers={"If-Match": etag})
+    assert r.status_code == 200
+    r = client.put(f"/api/projects/{pid}", json={"name": "R", "owner_id": uid}, headers={"If-Match": etag})
+    assert r.status_code == 412
+
+
+def test_conditional_get_from_cache_runs_no_queries(client, make_user):
+    user = make_user()
+    etag = client.get(f"/api/users/{user['id']}").headers["etag"]
+    r = client.get(f"/api/users/{user['id']}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["X-DB-Queries"] == "0"
+
+
+def test_list_etag_follows_row_versions(client, make_user):
+    uid = make_user()["id"]
+    client.post(f"/api/users/{uid}/projects", json={"name": "P"})
+    url = f"/api/users/{uid}/projects"
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    client.patch("/api/projects/1", json={"name": "Q"})
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200